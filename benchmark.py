@@ -0,0 +1,179 @@
+import argparse
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime
+
+from clinic import analytics, dashboard, db, export, importer, open_database, patients, reports, visits, worklist
+from generate_test_data import generate_test_data
+
+# Times the service-layer operations the app relies on against a synthetic
+# dataset and appends the results to a JSON-lines file, so runs can be
+# compared across commits:
+#
+#   python benchmark.py --patients 100000
+#   python benchmark.py --patients 100000 --compare     # vs. previous run
+
+DATASET_DIR = "bench_data"
+RESULTS_FILE = "bench_results.jsonl"
+REGRESSION_THRESHOLD = 1.25         # flag anything 25% slower than last time
+
+def dataset_path(patients_count, min_visits, max_visits, days, seed):
+    name = f"bench_{patients_count}p_{min_visits}-{max_visits}v_{days}d_s{seed}.db"
+    return os.path.join(DATASET_DIR, name)
+
+def ensure_dataset(path, patients_count, min_visits, max_visits, days, seed):
+    # Datasets are generated once per parameter set and reused
+    open_database(path)
+    if db.query_one("SELECT COUNT(*) FROM Patients")[0] == 0:
+        print(f"Generating {path} ...")
+        generate_test_data(patients_count, min_visits, max_visits, days, seed=seed)
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"min_ms": min(samples) * 1000, "median_ms": statistics.median(samples) * 1000}
+
+def run_benchmarks(repeat, seed, workdir):
+    rng = random.Random(seed)
+    mrns = [row[0] for row in db.query("SELECT mrn FROM Patients ORDER BY random() LIMIT 100")]
+    middle_mrn = db.query_one("SELECT mrn FROM Patients ORDER BY mrn LIMIT 1 OFFSET "
+                              "(SELECT COUNT(*) / 2 FROM Patients)")[0]
+    middle_by_name = patients.sort_key("last_name")(db.query_one(
+        "SELECT mrn, first_name, last_name, age, translator FROM Patients "
+        "ORDER BY last_name COLLATE NOCASE, mrn LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM Patients)"))
+    # Dates that migration 8 couldn't read (VisitDateIssues) are left out
+    first_date, last_date = db.query_one("SELECT MIN(visit_date), MAX(visit_date) FROM Visits "
+                                         "WHERE visit_date = date(visit_date)")
+    middle_date = date.fromisoformat(first_date) + (date.fromisoformat(last_date) -
+                                                    date.fromisoformat(first_date)) / 2
+    export_path = os.path.join(workdir, "patients.csv")
+    report_path = os.path.join(workdir, "report.csv")
+    analytics_dir = os.path.join(workdir, "analytics")
+
+    cases = {
+        "get_patients": lambda: patients.get_patients(),
+        "get_patients_page_first": lambda: patients.get_patients_page(),
+        "get_patients_page_middle": lambda: patients.get_patients_page((middle_mrn, middle_mrn)),
+        "get_patients_page_by_last_name_middle": lambda: patients.get_patients_page(
+            middle_by_name, sort="last_name"),
+        "get_visits_for_patient x100": lambda: [visits.get_visits_for_patient(m) for m in mrns],
+        "get_visits_for_patient x100 uncached": lambda: [visits.get_visits_for_patient(m, cached=False)
+                                                         for m in mrns],
+        "search_prefix": lambda: patients.search_patients("smi"),
+        "search_two_words": lambda: patients.search_patients("jo smith"),
+        "search_mrn": lambda: patients.search_patients(rng.choice(mrns)),
+        "export_patients": lambda: patients.export_csv(export_path),
+        "import_patients": lambda: importer.import_csv(export_path, "Patients"),
+        "export_all_gzip": lambda: export.export_all(os.path.join(workdir, "export"), compress=True),
+        "generate_report": lambda: reports.write_report(report_path, first_date, last_date),
+        "dashboard": lambda: dashboard.get_dashboard(),
+        "worklist_14_days": lambda: worklist.get_worklist(14, today=middle_date),
+    }
+    if importlib.util.find_spec("pandas"):
+        # analytics mode is optional; the group-by runs on the snapshot just built
+        cases["analytics_rebuild"] = lambda: analytics.refresh(analytics_dir, rebuild=True)
+        cases["analytics_by_physician_month"] = lambda: analytics.summarize(
+            ("physician", "month"), directory=analytics_dir)
+
+    results = {}
+    for name, fn in cases.items():
+        # import_patients re-imports the file export_patients just wrote
+        results[name] = timed(fn, repeat)
+        print(f"  {name:<30}{results[name]['median_ms']:10.1f} ms")
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def previous_run(results_file, dataset):
+    if not os.path.exists(results_file):
+        return None
+    last = None
+    with open(results_file) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["dataset"] == dataset:
+                last = record
+    return last
+
+def compare(previous, results):
+    print(f"Compared with {previous['timestamp']} ({previous.get('revision') or 'unknown revision'}):")
+    regressions = 0
+    for name, timing in results.items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+        ratio = timing["median_ms"] / max(before["median_ms"], 1e-6)
+        flag = "  <-- slower" if ratio > REGRESSION_THRESHOLD else ""
+        regressions += bool(flag)
+        print(f"  {name:<30}{before['median_ms']:10.1f} -> {timing['median_ms']:10.1f} ms "
+              f"({ratio:5.2f}x){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark clinic data operations")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--min-visits", type=int, default=3)
+    parser.add_argument("--max-visits", type=int, default=5)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", help="benchmark an existing database instead of a generated one "
+                                     "(its patients are re-imported in place)")
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument("--compare", action="store_true",
+                        help="compare with the previous run on the same dataset")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        path = args.db
+        open_database(path)
+    else:
+        os.makedirs(DATASET_DIR, exist_ok=True)
+        path = dataset_path(args.patients, args.min_visits, args.max_visits, args.days, args.seed)
+        ensure_dataset(path, args.patients, args.min_visits, args.max_visits, args.days, args.seed)
+
+    patient_count = db.query_one("SELECT COUNT(*) FROM Patients")[0]
+    visit_count = db.query_one("SELECT COUNT(*) FROM Visits")[0]
+    print(f"Benchmarking {path}: {patient_count:,} patients, {visit_count:,} visits")
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_benchmarks(args.repeat, args.seed, workdir)
+    finally:
+        db.close_all()
+
+    dataset = os.path.basename(path)
+    previous = previous_run(args.results, dataset)
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "dataset": dataset,
+        "patients": patient_count,
+        "visits": visit_count,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.results, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to {args.results}")
+
+    if args.compare and previous:
+        return 1 if compare(previous, results) else 0
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,8 @@
+def open_database(path=None):
+    # Point the data layer at a database file (default: clinic_data.db in the
+    # working directory) and bring its schema up to date. Everything else in
+    # the package can be used headlessly once this has run.
+    from clinic import db, migrations
+    if path is not None:
+        db.set_db_path(path)
+    migrations.migrate()
@@ -0,0 +1,162 @@
+import json
+import os
+
+from clinic import dates, db
+
+# Optional analytics mode for multi-year trend questions. Instead of joining
+# Patients, Visits and Followups in SQLite for every question, the joined
+# rows are kept as one column-oriented pandas DataFrame, saved as Parquet in
+# SNAPSHOT_DIR, and the group-bys run vectorized over its columns.
+#
+# Refreshing reads only what changed: ChangeLog (migration 7) holds the
+# latest change number of every row, so rows logged after the snapshot's
+# watermark are dropped from the frame and read again. The snapshot is
+# rebuilt when it is missing, belongs to another database file, or is ahead
+# of the log (an older backup was restored).
+#
+# Needs pandas and pyarrow; nothing else in the app imports them.
+
+SNAPSHOT_DIR = "analytics"
+REBUILD_FRACTION = 0.25            # rebuild instead when this share of the rows changed
+LOOKUP_CHUNK = 500                 # keys per IN (...) when re-reading changed rows
+
+COLUMNS = ("uid", "visit_id", "mrn", "visit_date", "month", "year", "physician", "age",
+           "translator", "last_cx", "ogtt", "opth", "modulator", "pft", "registry")
+# Columns summarize() can group by; stored as categoricals
+GROUP_COLUMNS = ("physician", "month", "year", "modulator", "registry", "translator",
+                 "opth", "pft", "ogtt")
+
+# Visits whose date could not be converted (VisitDateIssues) are left out;
+# they have no month to count them under
+_ROWS_SQL = """
+    SELECT v.uid, v.visit_id, v.mrn, v.visit_date, substr(v.visit_date, 1, 7) AS month,
+           substr(v.visit_date, 1, 4) AS year, v.physician, p.age, p.translator,
+           v.last_cx, v.ogtt, f.opth, f.modulator, f.pft, f.registry
+    FROM Visits v
+    JOIN Patients p ON p.mrn = v.mrn
+    LEFT JOIN Followups f ON f.visit_id = v.visit_id
+    WHERE v.visit_date = date(v.visit_date)
+"""
+
+# Last snapshot read or written per directory, so repeated questions in one
+# process don't re-read the Parquet file: directory -> (state, frame)
+_loaded = {}
+
+
+def _pandas():
+    try:
+        import pandas
+    except ImportError:
+        raise RuntimeError("Analytics mode needs the pandas and pyarrow packages") from None
+    return pandas
+
+
+def _paths(directory):
+    return os.path.join(directory, "visits.parquet"), os.path.join(directory, "snapshot.json")
+
+
+def _typed(frame):
+    # Blank instead of missing follow-up fields, so they group like any
+    # other value, and categoricals for the grouping columns
+    text = [column for column in COLUMNS if column != "visit_id"]
+    frame[text] = frame[text].fillna("")
+    return frame.astype({column: "category" for column in GROUP_COLUMNS})
+
+
+def _read_rows(conn, pd, where="", params=()):
+    return _typed(pd.read_sql_query(_ROWS_SQL + where, conn, params=list(params)))
+
+
+def _read_changed(conn, pd, frame, since):
+    # frame with every row changed after `since` replaced by its current
+    # version, or None when so much changed that a rebuild is cheaper
+    changed = conn.execute("SELECT table_name, row_key FROM ChangeLog WHERE seq > ?", (since,)).fetchall()
+    if len(changed) > REBUILD_FRACTION * len(frame):
+        return None
+    # Visits and Followups are logged by visit uid, Patients by mrn; a patient
+    # change (name, age, a new mrn) touches all of that patient's rows
+    keys = {"uid": sorted({key for table, key in changed if table != "Patients"}),
+            "mrn": sorted({key for table, key in changed if table == "Patients"})}
+    parts = [frame[~(frame["uid"].isin(keys["uid"]) | frame["mrn"].isin(keys["mrn"]))]]
+    for column, values in keys.items():
+        for i in range(0, len(values), LOOKUP_CHUNK):
+            chunk = values[i:i + LOOKUP_CHUNK]
+            parts.append(_read_rows(conn, pd, f" AND v.{column} IN ({','.join('?' * len(chunk))})", chunk))
+    # A row can come back twice, by its uid and by its patient's mrn
+    merged = pd.concat([part.astype({column: object for column in GROUP_COLUMNS}) for part in parts],
+                       ignore_index=True)
+    return _typed(merged.drop_duplicates("uid", ignore_index=True))
+
+
+def _load_snapshot(pd, directory):
+    if directory in _loaded:
+        return _loaded[directory]
+    data_path, state_path = _paths(directory)
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        frame = pd.read_parquet(data_path)       # categoricals survive the round trip
+    except (OSError, ValueError):
+        return None, None
+    except ImportError:
+        raise RuntimeError("Analytics mode needs the pyarrow package to read Parquet files") from None
+    return state, frame
+
+
+def _save_snapshot(directory, state, frame):
+    # Data first, then the state that describes it: after a crash in between
+    # the old watermark is still on disk, and re-reading changes is harmless
+    data_path, state_path = _paths(directory)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        frame.to_parquet(data_path + ".tmp", index=False)
+    except ImportError:
+        raise RuntimeError("Analytics mode needs the pyarrow package to write Parquet files") from None
+    os.replace(data_path + ".tmp", data_path)
+    with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(state_path + ".tmp", state_path)
+    _loaded[directory] = (state, frame)
+
+
+def refresh(directory=SNAPSHOT_DIR, rebuild=False):
+    # Brings the snapshot up to date and returns it as a DataFrame with
+    # COLUMNS, one row per visit
+    pd = _pandas()
+    with db.transaction(immediate=False) as conn:
+        # The watermark and the rows are read in one transaction, so a change
+        # committed meanwhile is either in both or in neither
+        current = {
+            "site": conn.execute("SELECT value FROM SyncState WHERE key = 'site_id'").fetchone()[0],
+            "seq": conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0],
+            "columns": list(COLUMNS),
+        }
+        state, frame = (None, None) if rebuild else _load_snapshot(pd, directory)
+        if state == current:
+            _loaded[directory] = (state, frame)
+            return frame
+        if (state is None or state["site"] != current["site"] or state["columns"] != current["columns"]
+                or state["seq"] > current["seq"]):
+            frame = None
+        else:
+            frame = _read_changed(conn, pd, frame, state["seq"])
+        if frame is None:
+            frame = _read_rows(conn, pd)
+    _save_snapshot(directory, current, frame)
+    return frame
+
+
+def summarize(by=("physician", "month"), start=None, end=None, directory=SNAPSHOT_DIR):
+    # [(group values..., visits, distinct patients)] for visits between start
+    # and end (either may be None), sorted by the group columns
+    unknown = [column for column in by if column not in GROUP_COLUMNS]
+    if unknown or not by:
+        raise ValueError(f"can only group by {', '.join(GROUP_COLUMNS)}")
+    frame = refresh(directory)
+    if start:
+        frame = frame[frame["visit_date"] >= dates.to_iso(start)]
+    if end:
+        frame = frame[frame["visit_date"] <= dates.to_iso(end)]
+    grouped = frame.groupby(list(by), observed=True, sort=True).agg(
+        visits=("uid", "size"), patients=("mrn", "nunique"))
+    return [tuple(row) for row in grouped.reset_index().itertuples(index=False, name=None)]
@@ -0,0 +1,41 @@
+import json
+from datetime import datetime
+
+from clinic import db
+
+# Reading the audit trail. AuditLog rows are written by triggers (migration
+# 10) in the same transaction as the change they describe; nothing here
+# writes. A patient's history is a range scan on idx_audit_mrn, newest first,
+# paged by audit_id.
+
+HISTORY_LIMIT = 200
+
+HEADINGS = ("When", "Who", "Record", "Action", "Changes")
+
+RECORDS = {"Patients": "Patient", "Visits": "Visit", "Followups": "Follow-up"}
+ACTIONS = {"I": "added", "U": "changed", "D": "deleted"}
+
+
+def describe(action, changes):
+    # "first_name: Jon -> John; age: (blank) -> 34" for updates,
+    # "visit_date=2024-05-01, physician=Dr. Smith" for adds and deletes
+    values = json.loads(changes)
+    if action == "U":
+        return "; ".join(f"{field}: {old or '(blank)'} -> {new or '(blank)'}"
+                         for field, (old, new) in values.items())
+    return ", ".join(f"{field}={value}" for field, value in values.items()) or "(all fields blank)"
+
+
+def get_patient_history(mrn, before=None, limit=HISTORY_LIMIT):
+    # [(audit_id, when, who, record, action, changes)] for everything recorded
+    # against the patient and their visits and follow-ups, newest first.
+    # Pass the last audit_id returned as `before` for the next page.
+    rows = db.query("""
+        SELECT audit_id, at, actor, table_name, row_key, action, changes FROM AuditLog
+        WHERE mrn = ? AND audit_id < ?
+        ORDER BY audit_id DESC LIMIT ?
+    """, (mrn, before if before is not None else 2 ** 63 - 1, limit))
+    return [(audit_id, datetime.fromtimestamp(at).strftime("%Y-%m-%d %H:%M:%S"), actor,
+             f"{RECORDS.get(table, table)} {row_key}", ACTIONS.get(action, action),
+             describe(action, changes))
+            for audit_id, at, actor, table, row_key, action, changes in rows]
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from clinic import db
+
+# Consistent copies of the live database. Copying clinic_data.db with the
+# file manager while the app (or another workstation) has it open can catch
+# it half-written; these go through SQLite instead.
+#
+# The default copy uses the online backup API a few MB at a time with a short
+# pause between steps, so nobody is locked out for the whole copy. The pause
+# is taken in the progress callback: Connection.backup's own sleep only
+# applies when a step comes back busy. If another connection writes in the
+# middle, SQLite restarts the copy; after MAX_RESTARTS the rest is copied in
+# one step. compact=True uses VACUUM INTO,
+# which writes a defragmented copy without free pages (smaller, slower).
+# Every copy is integrity-checked before it gets its final name.
+
+BACKUP_DIR = "backups"
+KEEP = 10                          # snapshots kept by create_snapshot
+PAGES_PER_STEP = 1024
+STEP_PAUSE_S = 0.005               # between steps, and before retrying a busy one
+MAX_RESTARTS = 3
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _online_copy(target, progress, should_cancel):
+    dest = sqlite3.connect(target)
+    try:
+        for attempt in range(MAX_RESTARTS + 1):
+            # remaining going up between steps means SQLite started over
+            # because another connection changed the file
+            last = [None]
+
+            def step(status, remaining, total):
+                if should_cancel and should_cancel():
+                    raise BackupCancelled()
+                if last[0] is not None and remaining > last[0] and attempt < MAX_RESTARTS:
+                    raise _Restarted()
+                last[0] = remaining
+                if progress:
+                    progress((total - remaining) / max(total, 1))
+                if remaining:
+                    time.sleep(STEP_PAUSE_S)
+
+            try:
+                db.get_connection().backup(dest, pages=PAGES_PER_STEP if attempt < MAX_RESTARTS else -1,
+                                           progress=step, sleep=STEP_PAUSE_S)
+                break
+            except _Restarted:
+                continue
+        # The copy inherits WAL mode; a snapshot should be one self-contained file
+        dest.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dest.close()
+
+
+def _compact_copy(target):
+    db.get_connection().execute("VACUUM INTO ?", (target,))
+    dest = sqlite3.connect(target)
+    try:
+        dest.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dest.close()
+
+
+def verify(path):
+    # Returns the problems PRAGMA integrity_check reports (empty if none)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    return [] if rows == ["ok"] else rows
+
+
+def export_snapshot(path, compact=False, progress=None, should_cancel=None):
+    # Copy the open database to `path`, check it, and only then move it into
+    # place; a failed or cancelled copy leaves nothing behind
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    try:
+        if compact:
+            _compact_copy(partial)
+        else:
+            _online_copy(partial, progress, should_cancel)
+        problems = verify(partial)
+        if problems:
+            raise BackupError(f"integrity check of {path} failed: " + "; ".join(problems[:5]))
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    if progress:
+        progress(1.0)
+    return path
+
+
+def list_snapshots(directory=BACKUP_DIR):
+    # Oldest first; names sort by their timestamp
+    prefix = os.path.splitext(os.path.basename(db.DB_PATH))[0] + "-"
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith(prefix) and name.endswith(".db")]
+
+
+def create_snapshot(directory=BACKUP_DIR, keep=KEEP, compact=False, progress=None,
+                    should_cancel=None):
+    # Writes <db name>-YYYYmmdd-HHMMSS.db into `directory` and then deletes
+    # all but the newest `keep` snapshots. Returns the new snapshot's path.
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(db.DB_PATH))[0]
+    path = os.path.join(directory, f"{stem}-{datetime.now():%Y%m%d-%H%M%S}.db")
+    while os.path.exists(path):
+        time.sleep(1)
+        path = os.path.join(directory, f"{stem}-{datetime.now():%Y%m%d-%H%M%S}.db")
+    export_snapshot(path, compact, progress, should_cancel)
+    for old in list_snapshots(directory)[:-keep] if keep else []:
+        os.remove(old)
+    return path
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+from clinic import changes
+
+VISIT_HISTORY_SIZE = 200           # patients whose visit history is kept in memory
+
+
+class LRUCache:
+    # A size-bounded, thread-safe least-recently-used cache. Every
+    # invalidation bumps a generation counter; load() only stores a result if
+    # nothing was invalidated while it was being computed, so a query that
+    # raced with a write can't put stale rows back.
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def load(self, key, loader, *args):
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        generation = self._generation
+        value = loader(*args)
+        with self._lock:
+            if generation == self._generation:
+                self._put(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# Visit history per MRN, as returned by visits.get_visits_for_patient.
+# Writers in this process invalidate the MRN they touched. When another
+# connection (another workstation, or one of our other threads) commits, the
+# Visits/Followups change counters tell whether it touched visit data; if so
+# the whole cache is cleared, since we can't tell which patients changed.
+visit_histories = LRUCache(VISIT_HISTORY_SIZE)
+
+_history_versions = None
+
+
+def check_external_changes():
+    global _history_versions
+    versions = changes.poll("cache")
+    if versions is None:
+        return
+    current = (versions.get("Visits"), versions.get("Followups"))
+    if current != _history_versions:
+        visit_histories.clear()
+        _history_versions = current
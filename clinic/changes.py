@@ -0,0 +1,23 @@
+from clinic import db
+
+# Detecting changes made by other workstations without re-querying the data.
+# PRAGMA data_version is free to read and moves whenever another connection
+# commits; only then are the per-table counters (ChangeCounters, maintained
+# by triggers) read to find out which tables were touched.
+
+
+def get_table_versions():
+    return dict(db.query("SELECT table_name, version FROM ChangeCounters"))
+
+
+def poll(tag="poll"):
+    # Returns the current table versions if anything was committed by another
+    # connection since this thread last polled with this tag, else None
+    if not db.changed_elsewhere(tag):
+        return None
+    return get_table_versions()
+
+
+def changed_tables(before, after):
+    # Tables whose counters differ between two get_table_versions() results
+    return {table for table, version in after.items() if before.get(table) != version}
@@ -0,0 +1,269 @@
+import argparse
+import csv
+import sys
+
+from clinic import (analytics, audit, backup, dashboard, db, duplicates, export, importer, open_database, patients, reports, sync,
+                    visits, worklist)
+
+# Headless entry point: python -m clinic <command> ...
+# Uses the same service functions as the desktop app, so scripts and
+# performance tests exercise the real code paths.
+
+
+def _print_rows(rows):
+    writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+    writer.writerows(rows)
+
+
+def cmd_patients(args):
+    if args.search:
+        _print_rows(patients.search_patients(args.search, limit=args.limit, sort=args.sort,
+                                             descending=args.descending))
+    else:
+        _print_rows(patients.get_patients_page(limit=args.limit, sort=args.sort or "mrn",
+                                               descending=args.descending))
+
+
+def cmd_visits(args):
+    _print_rows(visits.get_visits_for_patient(args.mrn))
+
+
+def cmd_history(args):
+    _print_rows(row[1:] for row in audit.get_patient_history(args.mrn, limit=args.limit))
+
+
+def cmd_add_patient(args):
+    patients.add_patient(args.mrn, args.first_name, args.last_name, args.age, args.translator)
+
+
+def cmd_add_visit(args):
+    visit_id = visits.add_visit(args.mrn, args.visit_date, args.physician,
+                                last_cx=args.last_cx, due_notes=args.due_notes, ogtt=args.ogtt,
+                                opth=args.opth, modulator=args.modulator, pft=args.pft,
+                                registry=args.registry)
+    print(visit_id)
+
+
+def cmd_date_issues(args):
+    _print_rows(visits.get_date_issues())
+
+
+def cmd_fix_date(args):
+    try:
+        visit_date = visits.fix_visit_date(args.visit_id, args.visit_date)
+    except ValueError as e:
+        sys.exit(f"fix-date: {e}")
+    print(f"visit {args.visit_id}: {visit_date}")
+
+
+def cmd_import(args):
+    result = importer.import_csv(args.file, args.table)
+    print(f"{result.imported} imported, {result.rejected} rejected")
+    if result.reject_path:
+        print(f"rejected rows written to {result.reject_path}")
+
+
+def cmd_export_patients(args):
+    patients.export_csv(args.file)
+
+
+def cmd_export(args):
+    tables = args.tables.split(",") if args.tables else list(export.EXPORT_TABLES)
+    for table, path in export.export_all(args.dir, tables, compress=args.gzip).items():
+        print(f"{table}: {path}")
+
+
+def cmd_report(args):
+    columns = args.columns.split(",") if args.columns else None
+    filters = {key: getattr(args, key) for key in reports.REPORT_FILTERS}
+    written = reports.write_report(args.file, args.start, args.end, columns, filters)
+    print(f"{written} rows written")
+
+
+def cmd_dashboard(args):
+    data = dashboard.get_dashboard(args.months)
+    for title, key in (("visits by physician and month", "visits_by_month"),
+                       ("modulator usage", "modulators"), ("registry consent", "registry"),
+                       ("overdue follow-ups by physician", "overdue")):
+        print(f"# {title}")
+        _print_rows(data[key])
+
+
+def cmd_analytics(args):
+    if args.rebuild:
+        analytics.refresh(args.dir, rebuild=True)
+    _print_rows(analytics.summarize(args.by.split(","), args.start, args.end, directory=args.dir))
+
+
+def cmd_worklist(args):
+    _print_rows(worklist.get_worklist(args.days, args.physician, overdue=args.overdue))
+
+
+def cmd_duplicates(args):
+    for pair_score, a, b in duplicates.find_duplicates(args.min_score):
+        _print_rows([(f"{pair_score:.3f}",) + a + b])
+
+
+def cmd_merge(args):
+    moved = duplicates.merge_patients(args.keep, args.drop)
+    print(f"{moved} visits moved to {args.keep}, patient {args.drop} deleted")
+
+
+def cmd_backup(args):
+    if args.to:
+        path = backup.export_snapshot(args.to, compact=args.compact)
+    else:
+        path = backup.create_snapshot(args.dir, keep=args.keep, compact=args.compact)
+    print(f"{path} written and verified")
+
+
+def cmd_sync(args):
+    if args.conflicts:
+        _print_rows(sync.get_conflicts())
+        return
+    if not args.peer:
+        sys.exit("sync: the other database file is required")
+    result = sync.sync(args.peer, prefer=args.prefer, full=args.full)
+    print(f"{result.received} rows received, {result.sent} rows sent, "
+          f"{len(result.conflicts)} conflicts")
+    if result.split:
+        print(f"{result.split} visits numbered the same as a different visit here were kept as separate visits")
+    for table, key in result.conflicts:
+        print(f"conflict: {table} {key}")
+
+
+def cmd_migrate(args):
+    print(f"schema version {db.query_one('PRAGMA user_version')[0]}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m clinic", description="MBG Clinic command line tools")
+    parser.add_argument("--db", help="path to the clinic database (default: clinic_data.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("patients", help="list patients (first page) or search them")
+    p.add_argument("--search", help="full-text search terms")
+    p.add_argument("--limit", type=int, default=patients.PAGE_SIZE)
+    p.add_argument("--sort", choices=patients.COLUMNS, help="sort column (default: mrn, or relevance "
+                                                           "when searching)")
+    p.add_argument("--descending", action="store_true")
+    p.set_defaults(func=cmd_patients)
+
+    p = sub.add_parser("visits", help="show a patient's visit history")
+    p.add_argument("mrn")
+    p.set_defaults(func=cmd_visits)
+
+    p = sub.add_parser("history", help="show the audit trail of a patient, newest first")
+    p.add_argument("mrn")
+    p.add_argument("--limit", type=int, default=audit.HISTORY_LIMIT)
+    p.set_defaults(func=cmd_history)
+
+    p = sub.add_parser("add-patient", help="add a patient")
+    p.add_argument("mrn")
+    p.add_argument("first_name")
+    p.add_argument("last_name")
+    p.add_argument("--age", default="")
+    p.add_argument("--translator", default="")
+    p.set_defaults(func=cmd_add_patient)
+
+    p = sub.add_parser("add-visit", help="add a visit with its follow-up; prints the visit_id")
+    p.add_argument("mrn")
+    p.add_argument("visit_date")
+    p.add_argument("physician")
+    for name in ("last_cx", "due_notes", "ogtt", "opth", "modulator", "pft", "registry"):
+        p.add_argument("--" + name.replace("_", "-"), dest=name, default="")
+    p.set_defaults(func=cmd_add_visit)
+
+    p = sub.add_parser("date-issues", help="list visits whose date could not be read (schema 8)")
+    p.set_defaults(func=cmd_date_issues)
+
+    p = sub.add_parser("fix-date", help="set a visit's date, e.g. one listed by date-issues")
+    p.add_argument("visit_id", type=int)
+    p.add_argument("visit_date", help="YYYY-MM-DD (or another format the app reads)")
+    p.set_defaults(func=cmd_fix_date)
+
+    p = sub.add_parser("import", help="import a CSV file")
+    p.add_argument("table", choices=list(importer.IMPORT_TABLES))
+    p.add_argument("file")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export-patients", help="export all patients to CSV")
+    p.add_argument("file")
+    p.set_defaults(func=cmd_export_patients)
+
+    p = sub.add_parser("export", help="export whole tables to CSV files in a folder")
+    p.add_argument("dir")
+    p.add_argument("--tables", help="comma-separated: " + ",".join(export.EXPORT_TABLES))
+    p.add_argument("--gzip", action="store_true", help="write .csv.gz files")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("report", help="write a visit report (.xlsx or .csv)")
+    p.add_argument("start", help="YYYY-MM-DD")
+    p.add_argument("end", help="YYYY-MM-DD")
+    p.add_argument("file")
+    p.add_argument("--columns", help="comma-separated: " + ",".join(reports.REPORT_COLUMNS))
+    for key in reports.REPORT_FILTERS:
+        p.add_argument("--" + key)
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("dashboard", help="print the dashboard summaries")
+    p.add_argument("--months", type=int, default=dashboard.MONTHS)
+    p.set_defaults(func=cmd_dashboard)
+
+    p = sub.add_parser("analytics", help="visit and patient counts per group, from the columnar "
+                                         "snapshot (needs pandas and pyarrow)")
+    p.add_argument("--by", default="physician,month", help="comma-separated: " + ",".join(analytics.GROUP_COLUMNS))
+    p.add_argument("--start", help="YYYY-MM-DD")
+    p.add_argument("--end", help="YYYY-MM-DD")
+    p.add_argument("--dir", default=analytics.SNAPSHOT_DIR, help="snapshot folder (default: %(default)s)")
+    p.add_argument("--rebuild", action="store_true", help="rebuild the snapshot instead of refreshing it")
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser("worklist", help="list patients due for follow-up in the next N days")
+    p.add_argument("--days", type=int, default=worklist.DAYS)
+    p.add_argument("--physician")
+    p.add_argument("--overdue", action="store_true", help="include follow-ups already overdue")
+    p.set_defaults(func=cmd_worklist)
+
+    p = sub.add_parser("duplicates", help="list pairs of patients that look like the same person")
+    p.add_argument("--min-score", type=float, default=duplicates.MIN_SCORE)
+    p.set_defaults(func=cmd_duplicates)
+
+    p = sub.add_parser("merge", help="move one patient's visits to another and delete the first")
+    p.add_argument("keep", help="MRN to keep")
+    p.add_argument("drop", help="MRN to merge into it and delete")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("backup", help="write a verified snapshot of the database")
+    p.add_argument("--dir", default=backup.BACKUP_DIR, help="snapshot folder (default: %(default)s)")
+    p.add_argument("--keep", type=int, default=backup.KEEP, help="snapshots to keep, 0 for all")
+    p.add_argument("--to", help="write a single copy to this file instead (no rotation)")
+    p.add_argument("--compact", action="store_true", help="use VACUUM INTO for a compacted copy")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("sync", help="exchange changes with another copy of the database")
+    p.add_argument("peer", nargs="?", help="the other database file")
+    p.add_argument("--prefer", choices=("local", "remote"),
+                   help="resolve rows changed on both sides this way instead of recording a conflict")
+    p.add_argument("--full", action="store_true",
+                   help="compare every row (first sync of copies changed before schema 7)")
+    p.add_argument("--conflicts", action="store_true", help="list unresolved conflicts and exit")
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser("migrate", help="create or upgrade the database schema")
+    p.set_defaults(func=cmd_migrate)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    open_database(args.db)
+    try:
+        args.func(args)
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from datetime import date
+
+from clinic import db
+
+# Clinic dashboard figures. Everything here reads the Dashboard* summary
+# tables that triggers keep in step with Visits and Followups (migration 6),
+# so no query touches more than a few hundred rows.
+
+MONTHS = 12
+
+
+def _month_start(today, months_back):
+    month = today.year * 12 + today.month - 1 - months_back
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+def get_visits_by_month(months=MONTHS, today=None):
+    # (physician, "YYYY-MM", visits) for the last `months` months
+    today = today or date.today()
+    return db.query("""
+        SELECT physician, month, visits FROM DashboardMonthly
+        WHERE month >= ? ORDER BY physician, month
+    """, (_month_start(today, months - 1),))
+
+
+def get_followup_counts(field):
+    # (value, visits) for "modulator" or "registry", most common first
+    return db.query("""
+        SELECT value, visits FROM DashboardFollowup
+        WHERE field = ? ORDER BY visits DESC, value
+    """, (field,))
+
+
+def get_overdue_by_physician(today=None):
+    # (physician, patients) whose latest visit's follow-up date has passed
+    today = today or date.today()
+    return db.query("""
+        SELECT physician, COUNT(*) FROM DashboardDue
+        WHERE due_date < ? GROUP BY physician ORDER BY COUNT(*) DESC
+    """, (today.isoformat(),))
+
+
+def get_dashboard(months=MONTHS, today=None):
+    return {
+        "visits_by_month": get_visits_by_month(months, today),
+        "modulators": get_followup_counts("modulator"),
+        "registry": get_followup_counts("registry"),
+        "overdue": get_overdue_by_physician(today),
+    }
+
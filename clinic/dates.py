@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+# Visit dates are stored as ISO text (YYYY-MM-DD), which sorts and compares
+# correctly as a string, so date ranges can use idx_visits_date_mrn and
+# SQLite's date() functions work on the column directly. Input in the
+# formats below is accepted and normalized; slashed dates are read the US
+# way (month first).
+
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%m/%d/%y",
+    "%m-%d-%Y",
+    "%Y/%m/%d",
+    "%Y%m%d",
+    "%d %b %Y",
+    "%b %d %Y",
+    "%B %d %Y",
+    "%d %B %Y",
+)
+
+
+def to_iso(value):
+    # Returns value as "YYYY-MM-DD"; raises ValueError if it isn't a date
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = " ".join(str(value).replace(",", " ").split())
+    # A timestamp ("2024-03-05 14:30" / "2024-03-05T14:30:00") keeps its date
+    if len(text) > 10 and text[4:5] == "-" and text[10] in " T":
+        text = text[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"{value!r} is not a date (use YYYY-MM-DD)")
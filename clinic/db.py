@@ -0,0 +1,251 @@
+import functools
+import getpass
+import random
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from clinic import instrumentation
+
+DB_PATH = "clinic_data.db"
+
+# Connection tuning applied to every connection we hand out
+JOURNAL_MODE = "WAL"
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 20000              # negative cache_size means KiB instead of pages
+MMAP_SIZE = 256 * 1024 * 1024      # 256 MB memory-mapped reads
+STATEMENT_CACHE_SIZE = 256         # prepared statements kept per connection
+INSTRUMENT = True                  # per-query timing and slow-query log
+
+# busy_timeout covers most lock waits, but SQLite returns SQLITE_BUSY without
+# waiting when waiting could deadlock (e.g. a read transaction that wants to
+# write after another workstation committed). Writes are retried this many
+# times with jittered exponential backoff starting at BUSY_BACKOFF_S.
+BUSY_RETRIES = 5
+BUSY_BACKOFF_S = 0.05
+
+# Who AuditLog (migration 10) records as making this process's changes;
+# acting_as() adds context for one thread, e.g. "jdoe@FRONTDESK (import)".
+# The audit triggers read it from the one-row AuditActor table, which
+# transaction() fills for the length of each write transaction.
+def _default_actor():
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = "unknown"
+    return f"{user}@{socket.gethostname()}"
+
+
+AUDIT_ACTOR = _default_actor()
+
+# One long-lived connection per thread: the Tk thread gets its own and every
+# worker thread gets its own, so nothing is shared across threads.
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+
+def set_db_path(path):
+    global DB_PATH
+    close_all()
+    DB_PATH = path
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH,
+                           timeout=BUSY_TIMEOUT_MS / 1000,
+                           isolation_level=None,        # we manage transactions ourselves
+                           check_same_thread=False,     # so close_all() can run from any thread
+                           cached_statements=STATEMENT_CACHE_SIZE,
+                           factory=(instrumentation.InstrumentedConnection if INSTRUMENT
+                                    else sqlite3.Connection))
+    conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    # Lets delete triggers (search index, etc.) see rows removed by
+    # INSERT OR REPLACE
+    conn.execute("PRAGMA recursive_triggers=ON")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def current_actor():
+    return getattr(_local, "actor", None) or AUDIT_ACTOR
+
+
+def set_audit_actor(conn, actor, schema="main"):
+    # Only ever inside a write transaction: the row is cleared again before
+    # the commit, so writes from other tools are never credited to us
+    try:
+        conn.execute(f"UPDATE {schema}.AuditActor SET actor = ? WHERE id = 1", (actor,))
+    except sqlite3.OperationalError:
+        pass            # not migrated to schema 10 yet
+
+
+@contextmanager
+def acting_as(actor):
+    # Attributes the calling thread's changes to `actor` in AuditLog
+    previous = getattr(_local, "actor", None)
+    _local.actor = actor
+    conn = get_connection()
+    if conn.in_transaction:
+        set_audit_actor(conn, current_actor())
+    try:
+        yield
+    finally:
+        _local.actor = previous
+        if conn.in_transaction:
+            set_audit_actor(conn, current_actor())
+
+
+def get_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        _local.conn = conn
+        _local.seen_versions = {}
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+
+def changed_elsewhere(tag):
+    # PRAGMA data_version changes when any *other* connection commits to the
+    # file: another workstation, or another thread here. It is per-connection
+    # state, so the last value seen is kept per thread and per caller (tag).
+    # The first check on a new connection always reports a change.
+    version = get_connection().execute("PRAGMA data_version").fetchone()[0]
+    seen = _local.seen_versions
+    changed = seen.get(tag) != version
+    seen[tag] = version
+    return changed
+
+
+def close_connection():
+    # Close the calling thread's connection, e.g. when a worker thread exits
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    with _connections_lock:
+        if conn in _connections:
+            _connections.remove(conn)
+    conn.close()
+
+
+def close_all():
+    with _connections_lock:
+        conns = list(_connections)
+        _connections.clear()
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.conn = None
+
+
+@contextmanager
+def transaction(immediate=True):
+    # Commits on success and rolls back on any exception. Nested calls become
+    # savepoints, so helpers can be composed inside a larger transaction.
+    conn = get_connection()
+    if conn.in_transaction:
+        name = f"sp_{id(conn)}_{getattr(_local, 'depth', 0)}"
+        _local.depth = getattr(_local, "depth", 0) + 1
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            conn.execute(f"RELEASE {name}")
+        finally:
+            _local.depth -= 1
+        return
+
+    # BEGIN IMMEDIATE takes the write lock up front instead of failing halfway
+    # through when another workstation is writing.
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        if immediate:
+            set_audit_actor(conn, current_actor())
+        yield conn
+        if immediate:
+            set_audit_actor(conn, None)
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+def is_busy(error):
+    return (isinstance(error, sqlite3.OperationalError) and
+            getattr(error, "sqlite_errorcode", 0) & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED))
+
+
+def retry_on_busy(fn):
+    # For service functions that write: re-run the whole call if the database
+    # stays locked. Inside an enclosing transaction the error is passed up
+    # instead, since only the outermost transaction can be retried.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if (not is_busy(e) or attempt == BUSY_RETRIES or
+                        get_connection().in_transaction):
+                    raise
+            time.sleep(BUSY_BACKOFF_S * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
+
+
+def query(sql, params=()):
+    return get_connection().execute(sql, params).fetchall()
+
+
+def query_one(sql, params=()):
+    # Closed straight away so the statement is finished (and timed) now
+    # rather than whenever the cursor is collected
+    cur = get_connection().execute(sql, params)
+    try:
+        return cur.fetchone()
+    finally:
+        cur.close()
+
+
+def iter_query(sql, params=(), chunk_size=1000):
+    cur = get_connection().execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cur.close()
+
+
+def execute(sql, params=()):
+    # Outside a transaction() block each statement gets one of its own, so
+    # the audit trail knows who made it
+    if get_connection().in_transaction:
+        return get_connection().execute(sql, params)
+    with transaction() as conn:
+        return conn.execute(sql, params)
+
+
+def executemany(sql, seq_of_params):
+    if get_connection().in_transaction:
+        return get_connection().executemany(sql, seq_of_params)
+    with transaction() as conn:
+        return conn.executemany(sql, seq_of_params)
@@ -0,0 +1,180 @@
+import unicodedata
+from difflib import SequenceMatcher
+
+from clinic import cache, db
+
+# Finding the same person entered under two MRNs. Comparing every patient
+# with every other is quadratic, so patients are first grouped into blocks
+# by cheap keys and only pairs inside a block are scored:
+#   soundex(last name) + first initial + age   catches spelling variants
+#   full normalized last + first name          catches a changed age
+# The keys go into a temp table with an index, and the pairs are streamed out
+# of a self-join on it, so memory holds only the matches found, not the pairs
+# compared. A pair sharing both blocks comes out of the first one only.
+# Blocks bigger than MAX_BLOCK (a very common name) are skipped rather than
+# exploding into n^2 pairs.
+
+MIN_SCORE = 0.8
+MAX_BLOCK = 50
+CHUNK_SIZE = 5000
+
+_SOUNDEX_CODES = {c: d for d, letters in (("1", "bfpv"), ("2", "cgjkqsxz"), ("3", "dt"),
+                                          ("4", "l"), ("5", "mn"), ("6", "r")) for c in letters}
+
+
+class DuplicatesCancelled(Exception):
+    pass
+
+
+def normalize(name):
+    # Lowercase ASCII letters only: "O'Brien-Núñez" -> "obriennunez"
+    name = unicodedata.normalize("NFKD", name or "")
+    return "".join(c for c in name.lower() if "a" <= c <= "z")
+
+
+def soundex(name):
+    name = normalize(name)
+    if not name:
+        return ""
+    code, last = name[0].upper(), _SOUNDEX_CODES.get(name[0])
+    for c in name[1:]:
+        digit = _SOUNDEX_CODES.get(c)
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":           # h and w don't separate equal codes
+            last = digit
+    return code.ljust(4, "0")
+
+
+def block_keys(first_name, last_name, age):
+    first, last = normalize(first_name), normalize(last_name)
+    keys = []
+    if last:
+        keys.append(f"s|{soundex(last)}|{first[:1]}|{str(age or '').strip()}")
+    if first and last:
+        keys.append(f"n|{last}|{first}")
+    return keys
+
+
+def _similar(a, b):
+    return SequenceMatcher(None, a, b).ratio() if a and b else float(a == b)
+
+
+def score(a, b):
+    # a, b are (mrn, first_name, last_name, age, translator); 0..1
+    first_a, first_b = normalize(a[1]), normalize(b[1])
+    if first_a == first_b:
+        first = 1.0
+    elif min(len(first_a), len(first_b)) == 1 and first_a[:1] == first_b[:1]:
+        first = 0.8                 # "J" vs "John"
+    else:
+        first = _similar(first_a, first_b)
+    last = _similar(normalize(a[2]), normalize(b[2]))
+    try:
+        age = max(0.0, 1 - abs(int(a[3]) - int(b[3])) / 2)
+    except (TypeError, ValueError):
+        age = float(str(a[3]).strip() == str(b[3]).strip())
+    translator_a, translator_b = normalize(a[4]), normalize(b[4])
+    translator = 1.0 if translator_a == translator_b else 0.5 if not (translator_a and translator_b) else 0.0
+    return 0.4 * last + 0.35 * first + 0.15 * age + 0.1 * translator
+
+
+def _build_blocks(conn, progress, should_cancel):
+    conn.execute("DROP TABLE IF EXISTS temp.DuplicateBlocks")
+    conn.execute("CREATE TEMP TABLE DuplicateBlocks (block_key TEXT NOT NULL, mrn TEXT NOT NULL)")
+    total = conn.execute("SELECT COUNT(*) FROM Patients").fetchone()[0]
+    cur = conn.execute("SELECT mrn, first_name, last_name, age FROM Patients")
+    done = 0
+    while True:
+        rows = cur.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        conn.executemany("INSERT INTO temp.DuplicateBlocks VALUES (?, ?)",
+                         [(key, mrn) for mrn, first, last, age in rows
+                          for key in block_keys(first, last, age)])
+        done += len(rows)
+        if progress:
+            progress(0.5 * done / max(total, 1))
+        if should_cancel and should_cancel():
+            raise DuplicatesCancelled()
+    # Only blocks with something to compare are kept
+    conn.execute("""
+        DELETE FROM temp.DuplicateBlocks WHERE block_key IN (
+            SELECT block_key FROM temp.DuplicateBlocks
+            GROUP BY block_key HAVING COUNT(*) NOT BETWEEN 2 AND ?)
+    """, (MAX_BLOCK,))
+    conn.execute("CREATE INDEX temp.idx_duplicate_blocks ON DuplicateBlocks(block_key, mrn)")
+    conn.execute("CREATE INDEX temp.idx_duplicate_blocks_mrn ON DuplicateBlocks(mrn, block_key)")
+
+
+def find_duplicates(min_score=MIN_SCORE, progress=None, should_cancel=None):
+    # Returns [(score, patient_a, patient_b)], best first, where the patients
+    # are (mrn, first_name, last_name, age, translator) rows.
+    # progress(fraction) and should_cancel() work as in the other long jobs.
+    conn = db.get_connection()
+    _build_blocks(conn, progress, should_cancel)
+    try:
+        pairs = conn.execute("""
+            SELECT SUM(n * (n - 1) / 2) FROM (
+                SELECT COUNT(*) AS n FROM temp.DuplicateBlocks GROUP BY block_key)
+        """).fetchone()[0] or 0
+        cur = conn.execute("""
+            SELECT pa.mrn, pa.first_name, pa.last_name, pa.age, pa.translator,
+                   pb.mrn, pb.first_name, pb.last_name, pb.age, pb.translator
+            FROM temp.DuplicateBlocks a
+            JOIN temp.DuplicateBlocks b ON b.block_key = a.block_key AND b.mrn > a.mrn
+            JOIN Patients pa ON pa.mrn = a.mrn
+            JOIN Patients pb ON pb.mrn = b.mrn
+            WHERE NOT EXISTS (
+                SELECT 1 FROM temp.DuplicateBlocks c
+                JOIN temp.DuplicateBlocks d ON d.block_key = c.block_key AND d.mrn = b.mrn
+                WHERE c.mrn = a.mrn AND c.block_key < a.block_key)
+        """)
+        found, done = [], 0
+        while True:
+            rows = cur.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                a, b = row[:5], row[5:]
+                pair_score = score(a, b)
+                if pair_score >= min_score:
+                    found.append((round(pair_score, 3), a, b))
+            done += len(rows)
+            if progress:
+                progress(0.5 + 0.5 * min(done / max(pairs, 1), 1.0))
+            if should_cancel and should_cancel():
+                raise DuplicatesCancelled()
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.DuplicateBlocks")
+    found.sort(key=lambda item: (-item[0], item[1][0], item[2][0]))
+    return found
+
+
+@db.retry_on_busy
+def merge_patients(keep_mrn, drop_mrn):
+    # Moves drop_mrn's visits to keep_mrn, fills keep_mrn's blank age and
+    # translator from drop_mrn, and deletes drop_mrn, all in one
+    # transaction. Returns the number of visits moved.
+    if keep_mrn == drop_mrn:
+        raise ValueError("cannot merge a patient into itself")
+    with db.transaction() as conn:
+        found = {row[0] for row in conn.execute("SELECT mrn FROM Patients WHERE mrn IN (?, ?)",
+                                                (keep_mrn, drop_mrn))}
+        for mrn in (keep_mrn, drop_mrn):
+            if mrn not in found:
+                raise ValueError(f"no patient with MRN {mrn}")
+        moved = conn.execute("UPDATE Visits SET mrn = ? WHERE mrn = ?", (keep_mrn, drop_mrn)).rowcount
+        conn.execute("""
+            UPDATE Patients SET
+                age = CASE WHEN age = '' THEN (SELECT age FROM Patients WHERE mrn = :drop) ELSE age END,
+                translator = COALESCE(NULLIF(translator, ''),
+                                      (SELECT translator FROM Patients WHERE mrn = :drop))
+            WHERE mrn = :keep
+        """, {"keep": keep_mrn, "drop": drop_mrn})
+        conn.execute("DELETE FROM Patients WHERE mrn = ?", (drop_mrn,))
+    cache.visit_histories.invalidate(keep_mrn)
+    cache.visit_histories.invalidate(drop_mrn)
+    return moved
@@ -0,0 +1,89 @@
+import csv
+import gzip
+import os
+
+from clinic import db, importer
+
+CHUNK_SIZE = 2000
+
+# Full-table CSV exports. Rows are read CHUNK_SIZE at a time from one cursor
+# and written straight to the file (gzip-compressed when the name ends in
+# .gz), so memory use stays flat whatever the table size. The columns are
+# the ones the importer expects, with visits (and the follow-ups that belong
+# to them) identified by uid rather than the file-local visit_id, so
+# importing an uncompressed export into another database adds or updates
+# the same visits instead of overwriting unrelated ones.
+EXPORT_TABLES = {
+    "Patients": "SELECT mrn, first_name, last_name, age, translator FROM Patients ORDER BY mrn",
+    "Visits": "SELECT uid, mrn, visit_date, physician, last_cx, due_notes, ogtt FROM Visits "
+              "ORDER BY visit_id",
+    "Followups": "SELECT v.uid, f.opth, f.modulator, f.pft, f.registry FROM Followups f "
+                 "JOIN Visits v ON v.visit_id = f.visit_id ORDER BY f.visit_id",
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _columns(table):
+    return importer.IMPORT_TABLES[table]["columns"]
+
+
+def _open(path):
+    if path.endswith(".gz"):
+        # Level 6 (gzip's own default) writes these files more than twice as
+        # fast as Python's default of 9, for about 5% more bytes
+        return gzip.open(path, "wt", compresslevel=6, newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8-sig")
+
+
+def _write_table(path, table, done, total, progress, should_cancel):
+    with _open(path) as f:
+        writer = csv.writer(f)
+        writer.writerow(_columns(table))
+        cur = db.get_connection().execute(EXPORT_TABLES[table])
+        while True:
+            rows = cur.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            writer.writerows(rows)
+            done += len(rows)
+            if progress:
+                progress(done, total)
+            if should_cancel and should_cancel():
+                raise ExportCancelled()
+    return done
+
+
+def export_tables(paths, progress=None, should_cancel=None):
+    # paths maps table name -> output file. All tables are read inside one
+    # read transaction, so they agree with each other even while others keep
+    # writing. progress(written, total) is called after every chunk and
+    # should_cancel() checked between chunks; a failed or cancelled export
+    # removes the files it wrote. Returns {table: rows written}.
+    written = {}
+    try:
+        with db.transaction(immediate=False) as conn:
+            counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in paths}
+            total, done = sum(counts.values()), 0
+            for table, path in paths.items():
+                written[table] = None
+                after = _write_table(path, table, done, total, progress, should_cancel)
+                written[table], done = after - done, after
+    except BaseException:
+        for table in written:
+            if os.path.exists(paths[table]):
+                os.remove(paths[table])
+        raise
+    return written
+
+
+def export_all(directory, tables=tuple(EXPORT_TABLES), compress=False, progress=None,
+               should_cancel=None):
+    # Writes <table>.csv (or .csv.gz) for each table into directory
+    os.makedirs(directory, exist_ok=True)
+    suffix = ".csv.gz" if compress else ".csv"
+    paths = {table: os.path.join(directory, table.lower() + suffix) for table in tables}
+    export_tables(paths, progress, should_cancel)
+    return paths
@@ -0,0 +1,28 @@
+from clinic import cache, db
+
+COLUMNS = ("visit_id", "opth", "modulator", "pft", "registry")
+
+
+def get_followup(visit_id):
+    row = db.query_one("""
+        SELECT visit_id, opth, modulator, pft, registry FROM Followups WHERE visit_id = ?
+    """, (visit_id,))
+    return dict(zip(COLUMNS, row)) if row else None
+
+
+@db.retry_on_busy
+def save_followup(visit_id, opth="", modulator="", pft="", registry=""):
+    # Followups are 1:1 with visits (unique index on visit_id), so saving
+    # either creates the row or updates it in place
+    db.execute("""
+        INSERT INTO Followups (visit_id, opth, modulator, pft, registry)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(visit_id) DO UPDATE SET
+            opth=excluded.opth,
+            modulator=excluded.modulator,
+            pft=excluded.pft,
+            registry=excluded.registry
+    """, (visit_id, opth, modulator, pft, registry))
+    row = db.query_one("SELECT mrn FROM Visits WHERE visit_id = ?", (visit_id,))
+    if row:
+        cache.visit_histories.invalidate(row[0])
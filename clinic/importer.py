@@ -0,0 +1,267 @@
+import csv
+import os
+import sqlite3
+
+from clinic import cache, dates, db
+
+BATCH_SIZE = 5000
+ENCODING_SAMPLE = 64 * 1024          # bytes read to tell UTF-8 from cp1252
+
+# Per table: the columns in file order when there is no usable header, the
+# columns that must be non-empty, and the upsert used for each batch. Re-
+# importing the same file updates rows in place instead of duplicating them.
+# Visits are matched by uid, never by visit_id: visit_id is numbered
+# separately in every database file, so an id read from another file names
+# an unrelated visit here. A visit without a uid is added as a new visit.
+# Follow-ups name their visit by its uid too.
+IMPORT_TABLES = {
+    "Patients": {
+        "columns": ["mrn", "first_name", "last_name", "age", "translator"],
+        "required": ["mrn", "first_name", "last_name"],
+        "sql": """
+            INSERT INTO Patients (mrn, first_name, last_name, age, translator)
+            VALUES (:mrn, :first_name, :last_name, :age, :translator)
+            ON CONFLICT(mrn) DO UPDATE SET
+                first_name=excluded.first_name,
+                last_name=excluded.last_name,
+                age=excluded.age,
+                translator=excluded.translator
+        """,
+    },
+    "Visits": {
+        "columns": ["uid", "mrn", "visit_date", "physician", "last_cx", "due_notes", "ogtt"],
+        "required": ["mrn", "visit_date", "physician"],
+        "sql": """
+            INSERT INTO Visits (uid, mrn, visit_date, physician, last_cx, due_notes, ogtt)
+            VALUES (COALESCE(:uid, lower(hex(randomblob(16)))), :mrn, :visit_date, :physician,
+                    :last_cx, :due_notes, :ogtt)
+            ON CONFLICT(uid) DO UPDATE SET
+                mrn=excluded.mrn,
+                visit_date=excluded.visit_date,
+                physician=excluded.physician,
+                last_cx=excluded.last_cx,
+                due_notes=excluded.due_notes,
+                ogtt=excluded.ogtt
+        """,
+    },
+    "Followups": {
+        "columns": ["uid", "opth", "modulator", "pft", "registry"],
+        "required": ["uid"],
+        "sql": """
+            INSERT INTO Followups (visit_id, opth, modulator, pft, registry)
+            SELECT visit_id, :opth, :modulator, :pft, :registry FROM Visits WHERE uid = :uid
+            ON CONFLICT(visit_id) DO UPDATE SET
+                opth=excluded.opth,
+                modulator=excluded.modulator,
+                pft=excluded.pft,
+                registry=excluded.registry
+        """,
+    },
+}
+
+
+class ImportResult:
+    def __init__(self, table):
+        self.table = table
+        self.imported = 0
+        self.rejected = 0
+        self.reject_path = None
+
+
+def _normalize_header(name):
+    return name.strip().lower().replace(" ", "_")
+
+
+def _detect_encoding(path):
+    # Excel on Windows writes either UTF-8 with a BOM or cp1252
+    with open(path, "rb") as f:
+        sample = f.read(ENCODING_SAMPLE)
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the end of the sample is fine;
+        # at the end of the file itself it is a cp1252 accent
+        if len(sample) < ENCODING_SAMPLE or e.reason != "unexpected end of data":
+            return "cp1252"
+    return "utf-8-sig"
+
+
+class _CountingLines:
+    # Feeds csv.reader while tracking how far into the file we are; text file
+    # tell() is unavailable during iteration
+    def __init__(self, f):
+        self.f = f
+        self.chars = 0
+
+    def __iter__(self):
+        for line in self.f:
+            self.chars += len(line)
+            yield line
+
+
+def _column_map(header, spec):
+    # Map by header names when the header names every required column,
+    # otherwise fall back to the fixed column order
+    names = [_normalize_header(h) for h in header]
+    if all(col in names for col in spec["required"]):
+        return {col: names.index(col) for col in spec["columns"] if col in names}
+    return {col: i for i, col in enumerate(spec["columns"])}
+
+
+def _parse_row(fields, columns, spec):
+    if not any(field.strip() for field in fields):
+        return None, None
+    # Excel drops trailing empty cells, so short rows just read as blanks
+    record = {col: None for col in spec["columns"]}
+    for col, index in columns.items():
+        value = fields[index].strip() if index < len(fields) else ""
+        record[col] = value if value != "" else None
+    missing = [col for col in spec["required"] if record[col] is None]
+    if missing:
+        return None, "missing " + ", ".join(missing)
+    if record.get("visit_date") is not None:
+        try:
+            record["visit_date"] = dates.to_iso(record["visit_date"])
+        except ValueError as e:
+            return None, str(e)
+    if "age" in record and record["age"] is None:
+        record["age"] = ""              # Patients.age is NOT NULL
+    return record, None
+
+
+def _missing_parents(conn, table, records):
+    # Foreign keys checked per batch with one IN query instead of letting a
+    # single orphan abort the whole executemany
+    if table == "Visits":
+        keys = {r["mrn"] for r in records}
+        sql = "SELECT mrn FROM Patients WHERE mrn IN ({})"
+        field = "mrn"
+    elif table == "Followups":
+        keys = {r["uid"] for r in records}
+        sql = "SELECT uid FROM Visits WHERE uid IN ({})"
+        field = "uid"
+    else:
+        return None, set()
+    found = set()
+    keys = list(keys)
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        found.update(row[0] for row in conn.execute(sql.format(",".join("?" * len(chunk))), chunk))
+    return field, set(keys) - found
+
+
+def _write_batch(conn, table, spec, batch, rejects):
+    field, missing = _missing_parents(conn, table, [record for _, record, _ in batch])
+    if missing:
+        parent = "patient" if field == "mrn" else "visit"
+        kept = []
+        for line_no, record, fields in batch:
+            if record[field] in missing:
+                rejects.append((line_no, f"no {parent} with {field} {record[field]}", fields))
+            else:
+                kept.append((line_no, record, fields))
+        batch = kept
+
+    # Fast path: the whole batch in one executemany. If something still
+    # fails (e.g. a constraint we don't pre-check), redo this batch row by
+    # row inside a savepoint so only the offending rows are rejected.
+    try:
+        with db.transaction():
+            conn.executemany(spec["sql"], [record for _, record, _ in batch])
+        return len(batch)
+    except sqlite3.IntegrityError:
+        pass
+
+    written = 0
+    with db.transaction():
+        for line_no, record, fields in batch:
+            try:
+                with db.transaction():
+                    conn.execute(spec["sql"], record)
+                written += 1
+            except sqlite3.IntegrityError as e:
+                rejects.append((line_no, str(e), fields))
+    return written
+
+
+class _RejectFile:
+    # Rejected rows go straight to disk, so a file full of bad rows doesn't
+    # pile up in memory; the file is only created if something is rejected
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.count = 0
+        self._f = None
+        self._writer = None
+
+    def append(self, item):
+        line_no, error, fields = item
+        if self._writer is None:
+            self._f = open(self.path, "w", newline="", encoding="utf-8-sig")
+            self._writer = csv.writer(self._f)
+            self._writer.writerow(["line", "error"] + self.header)
+        self._writer.writerow([line_no, error] + fields)
+        self.count += 1
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+
+
+def import_csv(path, table="Patients", batch_size=BATCH_SIZE, progress=None,
+               reject_path=None, fast=False):
+    # Streams the file in batches of batch_size rows; memory stays flat
+    # regardless of file size. Bad rows are written with their line number
+    # and reason to reject_path (default: <file>_rejects.csv) instead of
+    # aborting the import. progress(fraction, imported, rejected) is called
+    # after every batch. fast=True turns fsync off for the duration of the
+    # import: quicker, but an OS crash or power loss mid-import can corrupt
+    # the database file, so only use it on a copy that can be rebuilt.
+    spec = IMPORT_TABLES[table]
+    result = ImportResult(table)
+    total_chars = max(os.path.getsize(path), 1)
+    reject_path = reject_path or os.path.splitext(path)[0] + "_rejects.csv"
+    conn = db.get_connection()
+
+    if fast:
+        conn.execute("PRAGMA synchronous=OFF")
+    try:
+        actor = f"{db.current_actor()} (import {os.path.basename(path)})"
+        with open(path, "r", newline="", encoding=_detect_encoding(path)) as f, db.acting_as(actor):
+            lines = _CountingLines(f)
+            reader = csv.reader(lines)
+            header = next(reader, None)
+            if header is None:
+                return result
+            columns = _column_map(header, spec)
+            rejects = _RejectFile(reject_path, header)
+
+            try:
+                batch = []
+                for fields in reader:
+                    record, error = _parse_row(fields, columns, spec)
+                    if error:
+                        rejects.append((reader.line_num, error, fields))
+                    elif record is not None:
+                        batch.append((reader.line_num, record, fields))
+                    if len(batch) >= batch_size:
+                        result.imported += _write_batch(conn, table, spec, batch, rejects)
+                        batch = []
+                        if progress:
+                            progress(lines.chars / total_chars, result.imported, rejects.count)
+                if batch:
+                    result.imported += _write_batch(conn, table, spec, batch, rejects)
+            finally:
+                rejects.close()
+    finally:
+        if fast:
+            conn.execute("PRAGMA synchronous=NORMAL")
+        if table != "Patients":
+            cache.visit_histories.clear()
+
+    result.rejected = rejects.count
+    if rejects.count:
+        result.reject_path = reject_path
+    if progress:
+        progress(1.0, result.imported, result.rejected)
+    return result
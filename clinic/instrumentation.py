@@ -0,0 +1,247 @@
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Per-statement timing for every query the app runs. Connections are created
+# with InstrumentedConnection as their factory (see db._connect), so both the
+# db helpers and direct conn.execute() calls are covered.
+#
+# Lock waits are estimated from the progress handler: while SQLite is working
+# it calls back every PROGRESS_OPS VM instructions, microseconds apart. A gap
+# longer than WAIT_GAP_MS between callbacks means the statement was blocked
+# (busy handler sleeping on another workstation's lock, or slow I/O on the
+# share), and that gap is counted as lock wait.
+
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG = "slow_queries.log"
+PROGRESS_OPS = 1000
+WAIT_GAP_MS = 5
+
+_stats = {}
+_stats_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+class QueryStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.lock_wait_ms = 0.0
+        self.slow = 0
+        self.errors = 0
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+def _normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def get_stats():
+    with _stats_lock:
+        return sorted((vars(s).copy() | {"avg_ms": s.avg_ms} for s in _stats.values()),
+                      key=lambda s: s["total_ms"], reverse=True)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class _Execution:
+    # One execution of a statement. It is counted as soon as the statement
+    # has run, and the time spent fetching its rows is added as they are
+    # read, so a query whose rows are never fully read still shows up. The
+    # slow check runs once it is finished (rows exhausted, cursor closed or
+    # reused).
+    def __init__(self, conn, sql, params):
+        self.conn = conn
+        self.sql = sql
+        self.params = params
+        self.elapsed = 0.0
+        self.rows = 0
+        self.lock_wait = 0.0
+        self.error = None
+        self._recorded = None
+
+    def run(self, fn, *args):
+        start = time.perf_counter()
+        self.conn._last_tick = start
+        self.conn._wait = 0.0
+        try:
+            return fn(*args)
+        except sqlite3.Error as e:
+            self.error = e
+            raise
+        finally:
+            end = time.perf_counter()
+            gap = end - self.conn._last_tick
+            if gap * 1000 > WAIT_GAP_MS:
+                self.conn._wait += gap
+            self.elapsed += end - start
+            self.lock_wait += self.conn._wait
+
+    def record(self, slow=False):
+        # Adds whatever happened since the last call
+        key = _normalize(self.sql)
+        elapsed, rows, lock_wait = self._recorded or (0.0, 0, 0.0)
+        with _stats_lock:
+            stats = _stats.get(key)
+            if stats is None:
+                stats = _stats[key] = QueryStats(key)
+            if self._recorded is None:
+                stats.calls += 1
+                stats.errors += self.error is not None
+            stats.total_ms += (self.elapsed - elapsed) * 1000
+            stats.max_ms = max(stats.max_ms, self.elapsed * 1000)
+            stats.rows += self.rows - rows
+            stats.lock_wait_ms += (self.lock_wait - lock_wait) * 1000
+            stats.slow += slow
+        self._recorded = (self.elapsed, self.rows, self.lock_wait)
+
+    def finish(self):
+        elapsed_ms = self.elapsed * 1000
+        slow = SLOW_QUERY_MS is not None and elapsed_ms >= SLOW_QUERY_MS
+        self.record(slow)
+        if slow:
+            self.conn._log_slow(self, elapsed_ms)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _execution = None
+
+    def _finish(self):
+        if self._execution is not None:
+            self._execution.finish()
+            self._execution = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        self._execution = _Execution(self.connection, sql, params)
+        done = True
+        try:
+            self._execution.run(super().execute, sql, params)
+            if self.description is not None:   # a query: finished once its rows are fetched
+                done = False
+                self._execution.record()
+            else:
+                self._execution.rows = max(self.rowcount, 0)
+        finally:
+            # Failed statements are recorded too: one that gave up after the
+            # busy timeout is exactly the lock wait worth seeing
+            if done:
+                self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        self._execution = _Execution(self.connection, sql, "<executemany>")
+        try:
+            self._execution.run(super().executemany, sql, seq_of_params)
+            self._execution.rows = max(self.rowcount, 0)
+        finally:
+            self._finish()
+        return self
+
+    def fetchone(self):
+        if self._execution is None:
+            return super().fetchone()
+        row = self._execution.run(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._execution.rows += 1
+            self._execution.record()
+        return row
+
+    def fetchmany(self, size=None):
+        if self._execution is None:
+            return super().fetchmany(size or self.arraysize)
+        rows = self._execution.run(super().fetchmany, size or self.arraysize)
+        self._execution.rows += len(rows)
+        if len(rows) < (size or self.arraysize):
+            self._finish()
+        else:
+            self._execution.record()
+        return rows
+
+    def fetchall(self):
+        if self._execution is None:
+            return super().fetchall()
+        rows = self._execution.run(super().fetchall)
+        self._execution.rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # A cursor dropped with rows unread still gets its slow check
+        self._finish()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_tick = time.perf_counter()
+        self._wait = 0.0
+        self.set_progress_handler(self._tick, PROGRESS_OPS)
+
+    def _tick(self):
+        now = time.perf_counter()
+        if (now - self._last_tick) * 1000 > WAIT_GAP_MS:
+            self._wait += now - self._last_tick
+        self._last_tick = now
+        return 0
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def _log_slow(self, execution, elapsed_ms):
+        # Only the statement text, timings and plan: bound values are patient
+        # data and this file has no access control or rotation
+        if not SLOW_QUERY_LOG:
+            return
+        plan = []
+        if isinstance(execution.params, (tuple, list, dict)):
+            try:
+                cur = super().execute("EXPLAIN QUERY PLAN " + execution.sql, execution.params)
+                plan = [row[-1] for row in cur.fetchall()]
+            except sqlite3.Error:
+                pass        # e.g. PRAGMA, BEGIN/COMMIT: no plan to show
+        lines = [
+            f"{datetime.now().isoformat(timespec='seconds')}  {elapsed_ms:.1f} ms  "
+            f"rows={execution.rows}  lock_wait={execution.lock_wait * 1000:.1f} ms"
+            + (f"  error={execution.error}" if execution.error is not None else ""),
+            "  " + _normalize(execution.sql),
+        ] + [f"  plan: {step}" for step in plan]
+        with _log_lock:
+            try:
+                with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n\n")
+            except OSError:
+                pass
@@ -0,0 +1,603 @@
+from datetime import datetime
+
+from clinic import db
+
+# Schema history. Each entry upgrades the database by one version and runs in
+# its own transaction together with the PRAGMA user_version bump, so a failed
+# step leaves the file exactly at the previous version. Never edit a migration
+# that has shipped; append a new one instead.
+
+
+def _base_schema(conn):
+    # Matches the tables the app has always created, so files made by older
+    # builds (user_version 0) pass through this step unchanged.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Patients (
+            mrn TEXT PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            age TEXT NOT NULL,
+            translator TEXT
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Visits (
+            visit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mrn TEXT NOT NULL,
+            visit_date TEXT NOT NULL,
+            physician TEXT NOT NULL,
+            last_cx TEXT,
+            due_notes TEXT,
+            ogtt TEXT,
+            FOREIGN KEY (mrn) REFERENCES Patients(mrn)
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Followups (
+            followup_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            visit_id INTEGER NOT NULL,
+            opth TEXT,
+            modulator TEXT,
+            pft TEXT,
+            registry TEXT,
+            FOREIGN KEY (visit_id) REFERENCES Visits(visit_id)
+        )
+    """)
+
+
+def _visit_indexes(conn):
+    # Visit history: WHERE mrn = ? ORDER BY visit_date DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_visits_mrn_date ON Visits(mrn, visit_date DESC)")
+    # Reports: WHERE visit_date BETWEEN ? AND ?, joined back to Patients on mrn
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_visits_date_mrn ON Visits(visit_date, mrn)")
+
+    # Followups are 1:1 with visits. Older files may hold extra rows for the
+    # same visit; keep the newest in place and park the rest rather than
+    # dropping them, so the unique index can be built without losing data.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Followups_duplicates AS
+        SELECT * FROM Followups WHERE 0
+    """)
+    conn.execute("""
+        INSERT INTO Followups_duplicates
+        SELECT * FROM Followups f
+        WHERE f.followup_id < (SELECT MAX(followup_id) FROM Followups g
+                               WHERE g.visit_id = f.visit_id)
+    """)
+    conn.execute("""
+        DELETE FROM Followups
+        WHERE followup_id IN (SELECT followup_id FROM Followups_duplicates)
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_followups_visit ON Followups(visit_id)")
+
+    conn.execute("ANALYZE")
+
+
+def _patient_search_index(conn):
+    # External-content FTS5 index over the searchable patient columns. The
+    # prefix indexes make "smi*" style queries index lookups; the triggers
+    # keep it in step with every write to Patients.
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS Patients_fts USING fts5(
+            mrn, first_name, last_name, translator,
+            content='Patients', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='1 2 3'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Patients_fts_ai AFTER INSERT ON Patients BEGIN
+            INSERT INTO Patients_fts(rowid, mrn, first_name, last_name, translator)
+            VALUES (new.rowid, new.mrn, new.first_name, new.last_name, new.translator);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Patients_fts_ad AFTER DELETE ON Patients BEGIN
+            INSERT INTO Patients_fts(Patients_fts, rowid, mrn, first_name, last_name, translator)
+            VALUES ('delete', old.rowid, old.mrn, old.first_name, old.last_name, old.translator);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Patients_fts_au AFTER UPDATE ON Patients BEGIN
+            INSERT INTO Patients_fts(Patients_fts, rowid, mrn, first_name, last_name, translator)
+            VALUES ('delete', old.rowid, old.mrn, old.first_name, old.last_name, old.translator);
+            INSERT INTO Patients_fts(rowid, mrn, first_name, last_name, translator)
+            VALUES (new.rowid, new.mrn, new.first_name, new.last_name, new.translator);
+        END
+    """)
+    conn.execute("INSERT INTO Patients_fts(Patients_fts) VALUES ('rebuild')")
+
+
+CHANGE_TRACKED_TABLES = ("Patients", "Visits", "Followups")
+
+
+def _change_counters(conn):
+    # One counter per table, bumped by triggers on every row change, so a
+    # workstation that sees PRAGMA data_version move can tell which tables
+    # another one touched by reading three rows (see clinic.changes)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ChangeCounters (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for table in CHANGE_TRACKED_TABLES:
+        conn.execute("INSERT OR IGNORE INTO ChangeCounters (table_name) VALUES (?)", (table,))
+        for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_changed_{suffix} AFTER {event} ON {table} BEGIN
+                    UPDATE ChangeCounters SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+
+
+def _patient_sort_indexes(conn):
+    # One index per sortable column of the patient list, on the same
+    # expressions patients.SORTS orders by and with mrn as the tie-breaker,
+    # so sorted pages and prefix filters are index range scans
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_first_name "
+                 "ON Patients(first_name COLLATE NOCASE, mrn)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_last_name "
+                 "ON Patients(last_name COLLATE NOCASE, mrn)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_age "
+                 "ON Patients(CAST(age AS INTEGER), mrn)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_translator "
+                 "ON Patients(IFNULL(translator, '') COLLATE NOCASE, mrn)")
+    conn.execute("ANALYZE Patients")
+
+
+def _due_date_sql(notes, visit_date):
+    # SQL for the follow-up date implied by free-text due notes such as
+    # "Follow up in 6 months" / "RTC 2 weeks" / "1 year": the first number
+    # in the note and the first unit word, counted from the visit date.
+    # NULL when the note has no number or unit.
+    n = f"CAST(ltrim(lower({notes}), 'abcdefghijklmnopqrstuvwxyz -_:;,.()/') AS INTEGER)"
+    return f"""CASE WHEN {n} > 0 THEN
+        CASE WHEN lower({notes}) LIKE '%month%' THEN date({visit_date}, '+' || {n} || ' months')
+             WHEN lower({notes}) LIKE '%week%' THEN date({visit_date}, '+' || ({n} * 7) || ' days')
+             WHEN lower({notes}) LIKE '%year%' THEN date({visit_date}, '+' || {n} || ' years')
+             WHEN lower({notes}) LIKE '%day%' THEN date({visit_date}, '+' || {n} || ' days')
+        END
+    END"""
+
+
+def _dashboard_summaries(conn):
+    # Summary tables behind the dashboard, kept current by triggers so that
+    # opening it reads a few hundred rows instead of aggregating Visits:
+    #   DashboardMonthly  visits per physician per month (YYYY-MM)
+    #   DashboardFollowup follow-up counts per modulator / registry value
+    #   DashboardDue      each patient's latest visit and the follow-up date
+    #                     its due notes imply, for the overdue list
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS DashboardMonthly (
+            physician TEXT NOT NULL,
+            month TEXT NOT NULL,
+            visits INTEGER NOT NULL,
+            PRIMARY KEY (physician, month)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS DashboardFollowup (
+            field TEXT NOT NULL,
+            value TEXT NOT NULL,
+            visits INTEGER NOT NULL,
+            PRIMARY KEY (field, value)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS DashboardDue (
+            mrn TEXT PRIMARY KEY,
+            visit_id INTEGER NOT NULL,
+            visit_date TEXT,
+            physician TEXT,
+            due_date TEXT
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_dashboard_due ON DashboardDue(due_date, physician)")
+
+    monthly_add = """
+        INSERT INTO DashboardMonthly (physician, month, visits)
+        VALUES (new.physician, substr(new.visit_date, 1, 7), 1)
+        ON CONFLICT (physician, month) DO UPDATE SET visits = visits + 1;
+    """
+    monthly_remove = """
+        UPDATE DashboardMonthly SET visits = visits - 1
+        WHERE physician = old.physician AND month = substr(old.visit_date, 1, 7);
+        DELETE FROM DashboardMonthly
+        WHERE physician = old.physician AND month = substr(old.visit_date, 1, 7) AND visits <= 0;
+    """
+    # A new visit only matters if it is now the patient's latest; deletes and
+    # edits re-read the latest visit through idx_visits_mrn_date
+    due_insert = f"""
+        INSERT INTO DashboardDue (mrn, visit_id, visit_date, physician, due_date)
+        VALUES (new.mrn, new.visit_id, new.visit_date, new.physician,
+                {_due_date_sql("new.due_notes", "new.visit_date")})
+        ON CONFLICT (mrn) DO UPDATE SET
+            visit_id = excluded.visit_id, visit_date = excluded.visit_date,
+            physician = excluded.physician, due_date = excluded.due_date
+        WHERE (excluded.visit_date, excluded.visit_id) > (visit_date, visit_id);
+    """
+    due_refresh = """
+        DELETE FROM DashboardDue WHERE mrn = {row}.mrn;
+        INSERT INTO DashboardDue (mrn, visit_id, visit_date, physician, due_date)
+        SELECT mrn, visit_id, visit_date, physician, {due} FROM Visits
+        WHERE mrn = {row}.mrn ORDER BY visit_date DESC, visit_id DESC LIMIT 1;
+    """
+    due_new = due_refresh.format(row="new", due=_due_date_sql("due_notes", "visit_date"))
+    due_old = due_refresh.format(row="old", due=_due_date_sql("due_notes", "visit_date"))
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Visits_dashboard_ai AFTER INSERT ON Visits BEGIN
+            {monthly_add} {due_insert}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Visits_dashboard_ad AFTER DELETE ON Visits BEGIN
+            {monthly_remove} {due_old}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Visits_dashboard_au
+        AFTER UPDATE OF mrn, visit_date, physician, due_notes ON Visits BEGIN
+            {monthly_remove} {monthly_add} {due_old} {due_new}
+        END
+    """)
+
+    for field in ("modulator", "registry"):
+        add = f"""
+            INSERT INTO DashboardFollowup (field, value, visits)
+            VALUES ('{field}', IFNULL(new.{field}, ''), 1)
+            ON CONFLICT (field, value) DO UPDATE SET visits = visits + 1;
+        """
+        remove = f"""
+            UPDATE DashboardFollowup SET visits = visits - 1
+            WHERE field = '{field}' AND value = IFNULL(old.{field}, '');
+            DELETE FROM DashboardFollowup
+            WHERE field = '{field}' AND value = IFNULL(old.{field}, '') AND visits <= 0;
+        """
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Followups_{field}_ai AFTER INSERT ON Followups BEGIN
+                {add}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Followups_{field}_ad AFTER DELETE ON Followups BEGIN
+                {remove}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Followups_{field}_au AFTER UPDATE OF {field} ON Followups BEGIN
+                {remove} {add}
+            END
+        """)
+
+    # Fill the summaries from the rows already in the file
+    conn.execute("DELETE FROM DashboardMonthly")
+    conn.execute("""
+        INSERT INTO DashboardMonthly (physician, month, visits)
+        SELECT physician, substr(visit_date, 1, 7), COUNT(*) FROM Visits
+        GROUP BY physician, substr(visit_date, 1, 7)
+    """)
+    conn.execute("DELETE FROM DashboardFollowup")
+    for field in ("modulator", "registry"):
+        conn.execute(f"""
+            INSERT INTO DashboardFollowup (field, value, visits)
+            SELECT '{field}', IFNULL({field}, ''), COUNT(*) FROM Followups
+            GROUP BY IFNULL({field}, '')
+        """)
+    conn.execute("DELETE FROM DashboardDue")
+    conn.execute(f"""
+        INSERT INTO DashboardDue (mrn, visit_id, visit_date, physician, due_date)
+        SELECT mrn, visit_id, visit_date, physician, {_due_date_sql("due_notes", "visit_date")}
+        FROM (SELECT mrn, visit_id, physician, due_notes, visit_date,
+                     ROW_NUMBER() OVER (PARTITION BY mrn
+                                        ORDER BY visit_date DESC, visit_id DESC) AS rn
+              FROM Visits)
+        WHERE rn = 1
+    """)
+
+
+def _sync_change_log(conn):
+    # Row-level change tracking for syncing separate copies of the database
+    # (clinic.sync). Every file gets a random site id; ChangeLog holds one
+    # entry per changed row (its latest change, with a new seq each time)
+    # and the site the change came from, so a sync only has to look at rows
+    # changed since the last one. SyncPeers remembers how far each other
+    # copy's log has been applied here.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS SyncState (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        ) WITHOUT ROWID
+    """)
+    conn.execute("INSERT OR IGNORE INTO SyncState VALUES ('site_id', lower(hex(randomblob(16))))")
+    conn.execute("INSERT OR IGNORE INTO SyncState SELECT 'origin', value FROM SyncState WHERE key = 'site_id'")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS SyncPeers (
+            site_id TEXT PRIMARY KEY,
+            received_seq INTEGER NOT NULL DEFAULT 0,
+            synced_at TEXT
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ChangeLog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            deleted INTEGER NOT NULL,
+            origin TEXT,
+            UNIQUE (table_name, row_key)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS SyncConflicts (
+            id INTEGER PRIMARY KEY,
+            detected_at TEXT NOT NULL,
+            peer_site TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            local_row TEXT,
+            remote_row TEXT,
+            resolved INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # visit_id is assigned separately in each copy, so visits are matched
+    # across copies by uid. Existing visits get a uid derived from their id,
+    # so two copies upgraded separately still agree on their shared history;
+    # new visits get a random one. The app's INSERTs supply it themselves;
+    # the trigger only covers other writers, since its UPDATE writes the row
+    # (and fires every update trigger) a second time.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(Visits)")]
+    if "uid" not in columns:
+        conn.execute("ALTER TABLE Visits ADD COLUMN uid TEXT")
+    conn.execute("UPDATE Visits SET uid = 'v' || visit_id WHERE uid IS NULL")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_visits_uid ON Visits(uid)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Visits_uid_ai AFTER INSERT ON Visits WHEN new.uid IS NULL BEGIN
+            UPDATE Visits SET uid = lower(hex(randomblob(16))) WHERE visit_id = new.visit_id;
+        END
+    """)
+
+    # Delete-then-insert rather than INSERT OR REPLACE: a trigger's conflict
+    # clause is overridden by the statement that fired it (e.g. an upsert)
+    log = """
+        DELETE FROM ChangeLog WHERE table_name = '{table}' AND row_key = {key}{extra};
+        INSERT INTO ChangeLog (table_name, row_key, deleted, origin)
+        SELECT '{table}', {key}, {deleted}, value FROM SyncState
+        WHERE key = 'origin' AND {key} IS NOT NULL{extra};
+    """
+    keys = {
+        "Patients": ("new.mrn", "old.mrn"),
+        "Visits": ("new.uid", "old.uid"),
+        "Followups": ("(SELECT uid FROM Visits WHERE visit_id = new.visit_id)",
+                      "(SELECT uid FROM Visits WHERE visit_id = old.visit_id)"),
+    }
+    for table, (new_key, old_key) in keys.items():
+        logged = log.format(table=table, key=new_key, deleted=0, extra="")
+        removed = log.format(table=table, key=old_key, deleted=1, extra="")
+        # An update that changes the key removes the old key on the peer
+        moved = log.format(table=table, key=old_key, deleted=1, extra=f" AND {old_key} IS NOT {new_key}")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_log_ai AFTER INSERT ON {table} BEGIN {logged} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_log_au AFTER UPDATE ON {table} BEGIN {moved} {logged} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_log_ad AFTER DELETE ON {table} BEGIN {removed} END
+        """)
+
+
+# Formats found in hand-entered visit dates, as of migration 8. Kept here
+# rather than imported so the migration doesn't change when clinic.dates does.
+_LEGACY_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%Y/%m/%d", "%Y%m%d",
+                        "%d %b %Y", "%b %d %Y", "%B %d %Y", "%d %B %Y")
+
+
+def _legacy_date(text):
+    text = " ".join(text.replace(",", " ").split())
+    if len(text) > 10 and text[4:5] == "-" and text[10] in " T":
+        text = text[:10]
+    for fmt in _LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _iso_visit_dates(conn):
+    # visit_date was free text, but reports, sorting and the dashboard all
+    # compare it as YYYY-MM-DD. Rewrite other spellings in that form (the
+    # dashboard and change-log triggers follow the updates); values that
+    # can't be read as a date are left as they are and listed in
+    # VisitDateIssues for someone to fix (visits.fix_visit_date, migration 11).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS VisitDateIssues (
+            visit_id INTEGER PRIMARY KEY,
+            visit_date TEXT
+        )
+    """)
+    fixed, unreadable = [], []
+    for visit_id, value in conn.execute(
+            "SELECT visit_id, visit_date FROM Visits WHERE visit_date IS NOT date(visit_date, '+0 days')").fetchall():
+        iso = _legacy_date(value or "")
+        if iso:
+            fixed.append((iso, visit_id))
+        else:
+            unreadable.append((visit_id, value))
+    conn.executemany("UPDATE Visits SET visit_date = ? WHERE visit_id = ?", fixed)
+    conn.executemany("INSERT OR REPLACE INTO VisitDateIssues VALUES (?, ?)", unreadable)
+
+    # From now on only real YYYY-MM-DD dates get in, whichever code path
+    # writes them. date() alone lets 2024-02-30 through; with a modifier it
+    # rolls over to 2024-03-01, so that fails the comparison too.
+    for event, when in (("INSERT", "INSERT"), ("UPDATE", "UPDATE OF visit_date")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Visits_date_check_{event[0].lower()}
+            BEFORE {when} ON Visits
+            WHEN new.visit_date IS NOT date(new.visit_date, '+0 days') BEGIN
+                SELECT RAISE(ABORT, 'visit_date must be a valid YYYY-MM-DD date');
+            END
+        """)
+    conn.execute("ANALYZE Visits")
+
+
+def _visit_next_due(conn):
+    # The follow-up date each visit's due notes imply, as a generated column:
+    # SQLite computes it on every insert and update, so it can never go
+    # stale, and the partial index makes "due between X and Y" a range scan
+    # over visits that have a date at all (see clinic.worklist)
+    columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(Visits)")]
+    if "next_due" not in columns:
+        conn.execute(f"""
+            ALTER TABLE Visits ADD COLUMN next_due TEXT
+            GENERATED ALWAYS AS ({_due_date_sql("due_notes", "visit_date")}) VIRTUAL
+        """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_visits_next_due "
+                 "ON Visits(next_due, physician) WHERE next_due IS NOT NULL")
+    conn.execute("ANALYZE Visits")
+
+
+def _audit_log(conn):
+    # Append-only who/what/when trail. Triggers write one compact row per
+    # changed record in the same transaction as the change, so every path
+    # (forms, imports, batch entry, merges, sync) is covered and a bulk import
+    # adds rows to its own batch transactions rather than extra commits.
+    # changes is JSON: {field: value} of the non-blank fields of an added or
+    # deleted record, {field: [old, new]} of the fields an update changed.
+    # An update that changes nothing (re-importing the same file) is skipped.
+    #
+    # Who made a change comes from the one-row AuditActor table rather than
+    # a function only the app's connections have, so the sqlite3 shell, DB
+    # Browser or another script can still write to the file (recorded as
+    # 'unknown'). clinic.db fills the row at the start of each of its write
+    # transactions and clears it again before committing.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS AuditActor (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            actor TEXT
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO AuditActor (id, actor) VALUES (1, NULL)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS AuditLog (
+            audit_id INTEGER PRIMARY KEY,
+            at INTEGER NOT NULL,            -- unix time
+            actor TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            mrn TEXT,
+            action TEXT NOT NULL,           -- I, U or D
+            changes TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_mrn ON AuditLog(mrn, audit_id)")
+    for action in ("UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS AuditLog_no_{action.lower()} BEFORE {action} ON AuditLog BEGIN
+                SELECT RAISE(ABORT, 'AuditLog is append-only');
+            END
+        """)
+    audit = """
+        INSERT INTO AuditLog (at, actor, table_name, row_key, mrn, action, changes)
+        VALUES (CAST(strftime('%s', 'now') AS INTEGER),
+                COALESCE((SELECT actor FROM AuditActor WHERE id = 1), 'unknown'),
+                '{table}', {row}.{key}, {mrn}, '{action}', json_patch('{{}}', json_object({changes})));
+    """
+    # table: (key, mrn of the row, fields kept for adds/deletes, fields compared on update)
+    tables = {
+        "Patients": ("mrn", "{row}.mrn", ("first_name", "last_name", "age", "translator"),
+                     ("mrn", "first_name", "last_name", "age", "translator")),
+        "Visits": ("visit_id", "{row}.mrn", ("visit_date", "physician", "last_cx", "due_notes", "ogtt"),
+                   ("mrn", "visit_date", "physician", "last_cx", "due_notes", "ogtt")),
+        "Followups": ("visit_id", "(SELECT mrn FROM Visits WHERE visit_id = {row}.visit_id)",
+                      ("opth", "modulator", "pft", "registry"), ("opth", "modulator", "pft", "registry")),
+    }
+    for table, (key, mrn, kept, compared) in tables.items():
+        def values(row):
+            # json_patch drops the members left NULL, i.e. the blank fields
+            return ", ".join(f"'{field}', NULLIF({row}.{field}, '')" for field in kept)
+        diff = ", ".join(f"'{field}', CASE WHEN old.{field} IS NOT new.{field} "
+                         f"THEN json_array(old.{field}, new.{field}) END" for field in compared)
+        changed = " OR ".join(f"old.{field} IS NOT new.{field}" for field in compared)
+        added = audit.format(table=table, row="new", key=key, mrn=mrn.format(row="new"), action="I",
+                             changes=values("new"))
+        updated = audit.format(table=table, row="new", key=key, mrn=mrn.format(row="new"), action="U",
+                               changes=diff)
+        deleted = audit.format(table=table, row="old", key=key, mrn=mrn.format(row="old"), action="D",
+                               changes=values("old"))
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_audit_ai AFTER INSERT ON {table} BEGIN {added} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_audit_au AFTER UPDATE ON {table}
+            WHEN {changed} BEGIN {updated} END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_audit_ad AFTER DELETE ON {table} BEGIN {deleted} END
+        """)
+
+
+def _visit_date_issue_cleanup(conn):
+    # A VisitDateIssues entry goes away as soon as its visit gets a real date
+    # or is deleted, whichever path makes the change (fix-date, an import,
+    # sync). The date check triggers only let valid dates into visit_date,
+    # so any successful update of it is a fix.
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Visits_date_fixed AFTER UPDATE OF visit_date ON Visits BEGIN
+            DELETE FROM VisitDateIssues WHERE visit_id = new.visit_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Visits_date_issue_ad AFTER DELETE ON Visits BEGIN
+            DELETE FROM VisitDateIssues WHERE visit_id = old.visit_id;
+        END
+    """)
+    conn.execute("""
+        DELETE FROM VisitDateIssues WHERE visit_id NOT IN (
+            SELECT visit_id FROM Visits WHERE visit_date IS NOT date(visit_date, '+0 days'))
+    """)
+
+
+MIGRATIONS = [
+    _base_schema,
+    _visit_indexes,
+    _patient_search_index,
+    _change_counters,
+    _patient_sort_indexes,
+    _dashboard_summaries,
+    _sync_change_log,
+    _iso_visit_dates,
+    _visit_next_due,
+    _audit_log,
+    _visit_date_issue_cleanup,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version():
+    return db.query_one("PRAGMA user_version")[0]
+
+
+def migrate():
+    current = get_version()
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"{db.DB_PATH} was created by a newer version of the app "
+            f"(schema {current}, this build supports {SCHEMA_VERSION})")
+
+    for version, step in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        with db.transaction() as conn:
+            # Another workstation may have upgraded the file while we waited
+            # for the write lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version={version}")
+    return SCHEMA_VERSION
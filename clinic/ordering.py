@@ -0,0 +1,44 @@
+import re
+import string
+
+# Helpers for sorted, filtered grids whose ordering is done by SQLite. Rows
+# are ordered by (sort expression, unique tie-breaker) and paged with keyset
+# clauses, so each page is a range scan on an index over the same two values.
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_LEADING_INT = re.compile(r"\s*([+-]?\d+)")
+
+
+def nocase(value):
+    # Same folding as SQLite's NOCASE collation (ASCII letters only), so
+    # Python comparisons of the result agree with ORDER BY ... COLLATE NOCASE
+    # and the result can be passed back as a keyset cursor
+    return (value or "").translate(_ASCII_LOWER)
+
+
+def cast_integer(value):
+    # Python equivalent of CAST(value AS INTEGER) for text values
+    if isinstance(value, int):
+        return value
+    match = _LEADING_INT.match(value or "")
+    return int(match.group(1)) if match else 0
+
+
+def prefix_filter(expr, text):
+    # "starts with" as a range on expr, which an index on expr (with the same
+    # collation) can serve directly, unlike LIKE '%...%'
+    return f"{expr} >= ? AND {expr} < ?", [text, text + "\U0010ffff"]
+
+
+def keyset_clause(expr, tiebreak, cursor, ascending):
+    # Rows after cursor = (value, tiebreak value) in ORDER BY expr, tiebreak.
+    # Written as a range on expr plus a filter rather than a row-value
+    # comparison, which SQLite would answer by scanning the index from the start.
+    value, tie = cursor
+    op = ">" if ascending else "<"
+    return f"{expr} {op}= ? AND ({expr} {op} ? OR {tiebreak} {op} ?)", [value, value, tie]
+
+
+def order_clause(expr, tiebreak, ascending):
+    direction = "" if ascending else " DESC"
+    return f"{expr}{direction}, {tiebreak}{direction}"
@@ -0,0 +1,154 @@
+import csv
+import re
+
+from clinic import cache, db, ordering
+
+PAGE_SIZE = 200
+SEARCH_LIMIT = 500
+
+COLUMNS = ("mrn", "first_name", "last_name", "age", "translator")
+HEADINGS = ("MRN", "First Name", "Last Name", "Age", "Translator")
+
+# Sortable/filterable columns: column -> (SQL expression, Python function
+# giving the same order for a value). Each expression has an index on
+# (expression, mrn) from migration 5, so sorting and paging by any column is
+# an index range scan; mrn breaks ties.
+SORTS = {
+    "mrn": ("mrn", str),
+    "first_name": ("first_name COLLATE NOCASE", ordering.nocase),
+    "last_name": ("last_name COLLATE NOCASE", ordering.nocase),
+    "age": ("CAST(age AS INTEGER)", ordering.cast_integer),
+    "translator": ("IFNULL(translator, '') COLLATE NOCASE", ordering.nocase),
+}
+
+
+def get_patients():
+    return db.query("SELECT mrn, first_name, last_name, age, translator FROM Patients")
+
+
+def get_patient(mrn):
+    row = db.query_one("""
+        SELECT mrn, first_name, last_name, age, translator FROM Patients WHERE mrn = ?
+    """, (mrn,))
+    return dict(zip(COLUMNS, row)) if row else None
+
+
+def sort_key(sort="mrn"):
+    # key_for_row for a list sorted by `sort`: the keyset cursor
+    # get_patients_page expects, and a value that orders like the SQL does
+    index = COLUMNS.index(sort)
+    to_key = SORTS[sort][1]
+    return lambda row: (to_key(row[index]), row[0])
+
+
+def _filter_clauses(filters):
+    # filters maps column -> text; text columns match by prefix (ignoring
+    # case for names), age matches exactly
+    clauses, params = [], []
+    for column, text in (filters or {}).items():
+        text = text.strip()
+        if not text:
+            continue
+        if column == "age":
+            clauses.append("CAST(age AS INTEGER) = ?")
+            params.append(ordering.cast_integer(text))
+        else:
+            clause, values = ordering.prefix_filter(SORTS[column][0], text)
+            clauses.append(clause)
+            params.extend(values)
+    return clauses, params
+
+
+def get_patients_page(after=None, forward=True, limit=PAGE_SIZE, sort="mrn", descending=False,
+                      filters=None):
+    # Keyset pagination on (sort column, mrn): each page is an index range
+    # scan no matter how deep into the list the user has scrolled. `after` is
+    # a sort_key(sort) value, or None for the first page.
+    expr = SORTS[sort][0]
+    ascending = forward != descending
+    where, params = _filter_clauses(filters)
+    if after is not None:
+        if sort == "mrn":
+            where.append("mrn > ?" if ascending else "mrn < ?")
+            params.append(after[1])
+        else:
+            clause, values = ordering.keyset_clause(expr, "mrn", after, ascending)
+            where.append(clause)
+            params.extend(values)
+    if sort == "mrn":
+        order = "mrn" if ascending else "mrn DESC"
+    else:
+        order = ordering.order_clause(expr, "mrn", ascending)
+    where_sql = "WHERE " + " AND ".join(where) if where else ""
+    rows = db.query(f"""
+        SELECT mrn, first_name, last_name, age, translator FROM Patients
+        {where_sql}
+        ORDER BY {order} LIMIT ?
+    """, (*params, limit))
+    if not forward:
+        rows.reverse()
+    return rows
+
+
+def build_match_query(text):
+    # Every word typed must prefix-match some column: "jo smi" -> "jo"* "smi"*
+    # Words are quoted so FTS5 operators in user input are taken literally.
+    words = re.findall(r"\w+", text)
+    return " ".join('"' + word + '"*' for word in words)
+
+
+def search_patients(text, limit=SEARCH_LIMIT, sort=None, descending=False, filters=None):
+    # Ranked by relevance unless a sort column is given
+    match = build_match_query(text)
+    if not match:
+        return []
+    where, params = _filter_clauses(filters)
+    if sort is None:
+        # bm25 weights: an MRN hit beats a name hit beats a translator hit
+        order = "score"
+    else:
+        order = ordering.order_clause(SORTS[sort][0], "mrn", not descending)
+    where_sql = "WHERE " + " AND ".join(where) if where else ""
+    return db.query(f"""
+        SELECT mrn, first_name, last_name, age, translator
+        FROM (SELECT rowid AS match_rowid, bm25(Patients_fts, 10.0, 5.0, 5.0, 1.0) AS score
+              FROM Patients_fts WHERE Patients_fts MATCH ?)
+        JOIN Patients ON Patients.rowid = match_rowid
+        {where_sql}
+        ORDER BY {order}
+        LIMIT ?
+    """, (match, *params, limit))
+
+
+@db.retry_on_busy
+def add_patient(mrn, first_name, last_name, age="", translator=""):
+    db.execute("""
+        INSERT INTO Patients (mrn, first_name, last_name, age, translator)
+        VALUES (?, ?, ?, ?, ?)
+    """, (mrn, first_name, last_name, age, translator))
+
+
+@db.retry_on_busy
+def update_patient(mrn, first_name, last_name, age="", translator=""):
+    db.execute("""
+        UPDATE Patients 
+        SET first_name=?, last_name=?, age=?, translator=?
+        WHERE mrn=?
+    """, (first_name, last_name, age, translator, mrn))
+
+
+@db.retry_on_busy
+def delete_patient(mrn):
+    # Raises sqlite3.IntegrityError while the patient still has visits
+    db.execute("DELETE FROM Patients WHERE mrn=?", (mrn,))
+    cache.visit_histories.invalidate(mrn)
+
+
+def export_csv(path):
+    # Streams rows from the cursor instead of loading the table; see
+    # clinic.export for visits, follow-ups and compressed files
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADINGS)
+        writer.writerows(db.iter_query(
+            "SELECT mrn, first_name, last_name, age, translator FROM Patients ORDER BY mrn"))
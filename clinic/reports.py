@@ -0,0 +1,129 @@
+import csv
+import os
+
+from clinic import dates, db
+
+CHUNK_SIZE = 2000
+
+# Columns a report can include: key -> (heading, SQL expression)
+REPORT_COLUMNS = {
+    "first_name": ("First Name", "p.first_name"),
+    "last_name": ("Last Name", "p.last_name"),
+    "mrn": ("MRN", "p.mrn"),
+    "age": ("Age", "p.age"),
+    "translator": ("Translator", "p.translator"),
+    "visit_date": ("Visit Date", "v.visit_date"),
+    "physician": ("Physician", "v.physician"),
+    "last_cx": ("Last CX", "v.last_cx"),
+    "due_notes": ("Due Notes", "v.due_notes"),
+    "ogtt": ("OGTT", "v.ogtt"),
+    "opth": ("Opth", "f.opth"),
+    "modulator": ("Modulator", "f.modulator"),
+    "pft": ("PFT", "f.pft"),
+    "registry": ("Registry", "f.registry"),
+}
+
+DEFAULT_REPORT_COLUMNS = ["first_name", "last_name", "mrn", "visit_date", "physician",
+                          "opth", "modulator", "pft", "registry"]
+
+# Optional exact-match filters: key -> (label, SQL expression)
+REPORT_FILTERS = {
+    "physician": ("Physician", "v.physician"),
+    "modulator": ("Modulator", "f.modulator"),
+    "registry": ("Registry", "f.registry"),
+}
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+def build_report_query(start_date, end_date, columns=None, filters=None):
+    columns = columns or DEFAULT_REPORT_COLUMNS
+    select = ", ".join(REPORT_COLUMNS[col][1] for col in columns)
+    where = ["v.visit_date BETWEEN ? AND ?"]
+    # visit_date is ISO text, so this is a range scan on idx_visits_date_mrn
+    params = [dates.to_iso(start_date), dates.to_iso(end_date)]
+    for key, value in (filters or {}).items():
+        if value:
+            where.append(f"{REPORT_FILTERS[key][1]} = ?")
+            params.append(value)
+    from_where = f"""
+        FROM Visits v
+        JOIN Patients p ON p.mrn = v.mrn
+        LEFT JOIN Followups f ON v.visit_id = f.visit_id
+        WHERE {" AND ".join(where)}
+    """
+    return (f"SELECT {select} {from_where} ORDER BY v.visit_date DESC",
+            f"SELECT COUNT(*) {from_where}",
+            params)
+
+
+class _CsvSink:
+    def __init__(self, path):
+        self._f = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._f)
+
+    def write_row(self, row):
+        self._writer.writerow(row)
+
+    def close(self):
+        self._f.close()
+
+
+class _XlsxSink:
+    # openpyxl's write-only mode streams rows to the file instead of keeping
+    # every cell object in memory
+    def __init__(self, path):
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise RuntimeError("Excel reports need the openpyxl package; "
+                               "install it or save the report as .csv") from None
+        self.path = path
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Report")
+
+    def write_row(self, row):
+        self._ws.append(row)
+
+    def close(self):
+        self._wb.save(self.path)
+
+
+def write_report(path, start_date, end_date, columns=None, filters=None,
+                 progress=None, should_cancel=None):
+    # Walks the result cursor CHUNK_SIZE rows at a time and writes each chunk
+    # straight to the file, so memory use does not depend on the date range.
+    # The format follows the file extension (.xlsx or .csv).
+    # progress(written, total) is called after every chunk; should_cancel()
+    # is checked between chunks. Returns the number of rows written.
+    columns = columns or DEFAULT_REPORT_COLUMNS
+    sql, count_sql, params = build_report_query(start_date, end_date, columns, filters)
+    total = db.query_one(count_sql, params)[0]
+
+    is_xlsx = os.path.splitext(path)[1].lower() == ".xlsx"
+    sink = _XlsxSink(path) if is_xlsx else _CsvSink(path)
+    written = 0
+    try:
+        sink.write_row([REPORT_COLUMNS[col][0] for col in columns])
+        cur = db.get_connection().execute(sql, params)
+        while True:
+            rows = cur.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                sink.write_row(row)
+            written += len(rows)
+            if progress:
+                progress(written, total)
+            if should_cancel and should_cancel():
+                raise ReportCancelled()
+        sink.close()
+    except BaseException:
+        if not is_xlsx:
+            sink.close()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
@@ -0,0 +1,18 @@
+import sys
+import time
+
+# Startup timing for --profile-startup. Import this module first so the
+# "start" mark is taken before anything heavy loads.
+_marks = [("start", time.perf_counter())]
+
+
+def mark(label):
+    _marks.append((label, time.perf_counter()))
+
+
+def print_profile():
+    print("Startup profile:")
+    for (_, previous), (label, t) in zip(_marks, _marks[1:]):
+        print(f"  {label:<16}{(t - previous) * 1000:8.1f} ms")
+    total = _marks[-1][1] - _marks[0][1]
+    print(f"  {'total':<16}{total * 1000:8.1f} ms  ({len(sys.modules)} modules loaded)")
@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime
+
+from clinic import cache, db, migrations
+
+# Two-way delta sync between this database and another copy of it (e.g. a
+# file taken home on a laptop and brought back). Triggers record every
+# changed row in ChangeLog (migration 7); a sync attaches the other file and
+# exchanges only the rows each side changed since they last synced, so the
+# work is proportional to the changes, not the size of the tables.
+#
+# Rows are matched by mrn (Patients) and by visit uid (Visits, and Followups
+# through their visit). A row both copies changed differently since the last
+# sync is a conflict: by default it is left alone on both sides and recorded
+# in SyncConflicts for someone to resolve; prefer="local" or "remote" picks a
+# winner instead.
+
+_FIELDS = {
+    "Patients": ("first_name", "last_name", "age", "translator"),
+    "Visits": ("mrn", "visit_date", "physician", "last_cx", "due_notes", "ogtt"),
+    "Followups": ("opth", "modulator", "pft", "registry"),
+}
+
+_ROW_SQL = {
+    "Patients": "SELECT first_name, last_name, age, translator FROM {s}.Patients WHERE mrn = ?",
+    "Visits": """SELECT mrn, visit_date, physician, last_cx, due_notes, ogtt
+                 FROM {s}.Visits WHERE uid = ?""",
+    "Followups": """SELECT f.opth, f.modulator, f.pft, f.registry
+                    FROM {s}.Followups f JOIN {s}.Visits v ON v.visit_id = f.visit_id
+                    WHERE v.uid = ?""",
+}
+
+
+class SyncError(Exception):
+    pass
+
+
+class SyncResult:
+    def __init__(self):
+        self.received = 0          # rows changed here
+        self.sent = 0              # rows changed in the other file
+        self.conflicts = []        # (table, key) left for manual resolution
+        self.split = 0             # visits that shared a uid with an unrelated visit
+
+
+def _get_row(conn, schema, table, key):
+    row = conn.execute(_ROW_SQL[table].format(s=schema), (key,)).fetchone()
+    return dict(zip(_FIELDS[table], row)) if row else None
+
+
+def _site(conn, schema):
+    return conn.execute(f"SELECT value FROM {schema}.SyncState WHERE key = 'site_id'").fetchone()[0]
+
+
+def _set_site(conn, schema, site):
+    # Give a copy its own identity; its past changes move to the new id
+    old = _site(conn, schema)
+    conn.execute(f"UPDATE {schema}.SyncState SET value = ? WHERE key IN ('site_id', 'origin')", (site,))
+    conn.execute(f"UPDATE {schema}.ChangeLog SET origin = ? WHERE origin = ?", (site, old))
+
+
+def _copy_point(conn):
+    # For a file copy syncing for the first time: the last ChangeLog entry
+    # the two files still share. Everything up to it happened before the
+    # copy. A shared entry whose rows now differ can only be a coincidence
+    # after the copy (both sides' next change hitting the same row), since a
+    # later change on either side would have replaced the entry.
+    for seq, table, key in conn.execute("""
+        SELECT m.seq, m.table_name, m.row_key FROM main.ChangeLog m
+        JOIN peer.ChangeLog p ON p.seq = m.seq AND p.table_name = m.table_name
+                              AND p.row_key = m.row_key AND p.deleted = m.deleted
+        ORDER BY m.seq DESC
+    """).fetchall():
+        if _get_row(conn, "main", table, key) == _get_row(conn, "peer", table, key):
+            return seq
+    return 0
+
+
+def _changes(conn, schema, after_seq, exclude_origin):
+    # {(table, key): seq} for rows changed in `schema` after after_seq, not
+    # counting changes that came from the site we are syncing with
+    return {(table, key): seq for table, key, seq in conn.execute(f"""
+        SELECT table_name, row_key, seq FROM {schema}.ChangeLog
+        WHERE seq > ? AND origin IS NOT ?
+    """, (after_seq, exclude_origin))}
+
+
+def _received_seq(conn, schema, site):
+    row = conn.execute(f"SELECT received_seq FROM {schema}.SyncPeers WHERE site_id = ?", (site,)).fetchone()
+    return row[0] if row else 0
+
+
+def _mark_synced(conn, schema, site, seq):
+    conn.execute(f"""
+        INSERT INTO {schema}.SyncPeers (site_id, received_seq, synced_at) VALUES (?, ?, ?)
+        ON CONFLICT (site_id) DO UPDATE SET received_seq = excluded.received_seq,
+                                            synced_at = excluded.synced_at
+    """, (site, seq, datetime.now().isoformat(timespec="seconds")))
+
+
+def _apply(conn, src, dst, table, key):
+    # Make dst's row match src's current row (or lack of one)
+    row = _get_row(conn, src, table, key)
+    if table == "Patients":
+        if row is None:
+            conn.execute(f"DELETE FROM {dst}.Patients WHERE mrn = ?", (key,))
+        else:
+            conn.execute(f"""
+                INSERT INTO {dst}.Patients (mrn, first_name, last_name, age, translator)
+                VALUES (:key, :first_name, :last_name, :age, :translator)
+                ON CONFLICT (mrn) DO UPDATE SET first_name = excluded.first_name,
+                    last_name = excluded.last_name, age = excluded.age, translator = excluded.translator
+            """, {"key": key, **row})
+    elif table == "Visits":
+        if row is None:
+            conn.execute(f"DELETE FROM {dst}.Followups WHERE visit_id IN "
+                         f"(SELECT visit_id FROM {dst}.Visits WHERE uid = ?)", (key,))
+            conn.execute(f"DELETE FROM {dst}.Visits WHERE uid = ?", (key,))
+        else:
+            # The patient may not have been part of this delta
+            conn.execute(f"""
+                INSERT OR IGNORE INTO {dst}.Patients (mrn, first_name, last_name, age, translator)
+                SELECT mrn, first_name, last_name, age, translator FROM {src}.Patients WHERE mrn = ?
+            """, (row["mrn"],))
+            conn.execute(f"""
+                INSERT INTO {dst}.Visits (uid, mrn, visit_date, physician, last_cx, due_notes, ogtt)
+                VALUES (:key, :mrn, :visit_date, :physician, :last_cx, :due_notes, :ogtt)
+                ON CONFLICT (uid) DO UPDATE SET mrn = excluded.mrn, visit_date = excluded.visit_date,
+                    physician = excluded.physician, last_cx = excluded.last_cx,
+                    due_notes = excluded.due_notes, ogtt = excluded.ogtt
+            """, {"key": key, **row})
+    else:
+        visit = conn.execute(f"SELECT visit_id FROM {dst}.Visits WHERE uid = ?", (key,)).fetchone()
+        if visit is None:
+            return
+        if row is None:
+            conn.execute(f"DELETE FROM {dst}.Followups WHERE visit_id = ?", visit)
+        else:
+            conn.execute(f"""
+                INSERT INTO {dst}.Followups (visit_id, opth, modulator, pft, registry)
+                VALUES (:visit_id, :opth, :modulator, :pft, :registry)
+                ON CONFLICT (visit_id) DO UPDATE SET opth = excluded.opth,
+                    modulator = excluded.modulator, pft = excluded.pft, registry = excluded.registry
+            """, {"visit_id": visit[0], **row})
+
+
+# Order changes are applied in, so foreign keys hold at every step: child
+# rows are deleted first and parents written first, and patients are deleted
+# last, after the visits of a merged patient have moved to the other MRN
+_APPLY_ORDER = [("Followups", True), ("Visits", True), ("Patients", False), ("Visits", False),
+                ("Followups", False), ("Patients", True)]
+
+
+def _apply_all(conn, src, dst, keys, origin, result, peer_site):
+    # Changes written here are logged in dst as coming from `origin`, so
+    # they are not sent straight back
+    home = _site(conn, dst)
+    conn.execute(f"UPDATE {dst}.SyncState SET value = ? WHERE key = 'origin'", (origin,))
+    try:
+        rows = {key: _get_row(conn, src, *key) for key in keys}
+        ordered = sorted(rows, key=lambda k: _APPLY_ORDER.index((k[0], rows[k] is None)))
+        applied = 0
+        for table, key in ordered:
+            if _get_row(conn, dst, table, key) == rows[(table, key)]:
+                continue
+            try:
+                with db.transaction():
+                    _apply(conn, src, dst, table, key)
+                applied += 1
+            except sqlite3.IntegrityError:
+                # e.g. a patient deleted on one side who has new visits on the other
+                _record_conflict(conn, peer_site, table, key, result)
+        return applied
+    finally:
+        conn.execute(f"UPDATE {dst}.SyncState SET value = ? WHERE key = 'origin'", (home,))
+
+
+def _record_conflict(conn, peer_site, table, key, result):
+    local, remote = _get_row(conn, "main", table, key), _get_row(conn, "peer", table, key)
+    conn.execute("""
+        INSERT INTO SyncConflicts (detected_at, peer_site, table_name, row_key, local_row, remote_row)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (datetime.now().isoformat(timespec="seconds"), peer_site, table, key,
+          json.dumps(local), json.dumps(remote)))
+    result.conflicts.append((table, key))
+
+
+def _log_all_rows(conn, schema):
+    origin = f"(SELECT value FROM {schema}.SyncState WHERE key = 'origin')"
+    conn.execute(f"""
+        INSERT OR REPLACE INTO {schema}.ChangeLog (table_name, row_key, deleted, origin)
+        SELECT 'Patients', mrn, 0, {origin} FROM {schema}.Patients
+    """)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO {schema}.ChangeLog (table_name, row_key, deleted, origin)
+        SELECT 'Visits', uid, 0, {origin} FROM {schema}.Visits
+    """)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO {schema}.ChangeLog (table_name, row_key, deleted, origin)
+        SELECT 'Followups', v.uid, 0, {origin}
+        FROM {schema}.Followups f JOIN {schema}.Visits v ON v.visit_id = f.visit_id
+    """)
+
+
+def _split_reused_uids(conn):
+    # Migration 7 gave existing visits the uid 'v' || visit_id, and copies
+    # that split before it numbered their new visits from the same ids, so
+    # one such uid can name two unrelated visits. Where the patient, date or
+    # physician differ they are different visits: the peer's gets a fresh
+    # uid (and loses the log entries under the old one) so both are kept
+    # rather than conflicting or one overwriting the other.
+    rows = conn.execute("""
+        SELECT p.visit_id, p.uid FROM peer.Visits p JOIN main.Visits m ON m.uid = p.uid
+        WHERE p.uid GLOB 'v[0-9]*'
+          AND NOT (m.mrn IS p.mrn AND m.visit_date IS p.visit_date AND m.physician IS p.physician)
+    """).fetchall()
+    for visit_id, uid in rows:
+        conn.execute("UPDATE peer.Visits SET uid = lower(hex(randomblob(16))) WHERE visit_id = ?",
+                     (visit_id,))
+        conn.execute("DELETE FROM peer.ChangeLog WHERE table_name IN ('Visits', 'Followups') "
+                     "AND row_key = ?", (uid,))
+    return len(rows)
+
+
+def sync(peer_path, prefer=None, full=False):
+    # Exchange changes with the database at peer_path in both directions.
+    # full=True compares every row instead of just the logged changes, for
+    # the first sync of copies that diverged before change tracking existed;
+    # on the first one, visits the copies numbered alike are split apart
+    # unless they are the same visit (_split_reused_uids).
+    if prefer not in (None, "local", "remote"):
+        raise ValueError("prefer must be None, 'local' or 'remote'")
+    if not os.path.exists(peer_path):
+        raise SyncError(f"{peer_path} does not exist")
+    if os.path.abspath(peer_path) == os.path.abspath(db.DB_PATH):
+        raise SyncError("cannot sync a database with itself")
+
+    conn = db.get_connection()
+    conn.execute("ATTACH DATABASE ? AS peer", (peer_path,))
+    try:
+        version = conn.execute("PRAGMA peer.user_version").fetchone()[0]
+        if version != migrations.SCHEMA_VERSION:
+            raise SyncError(f"{peer_path} is at schema {version}, this build uses "
+                            f"{migrations.SCHEMA_VERSION}; open it with this version first")
+        result = SyncResult()
+        with db.transaction(), db.acting_as(f"{db.current_actor()} (sync with {os.path.basename(peer_path)})"):
+            # The peer's audit triggers read the peer's own AuditActor row
+            db.set_audit_actor(conn, db.current_actor(), "peer")
+            local_site = _site(conn, "main")
+            peer_site = _site(conn, "peer")
+            first_sync = conn.execute("SELECT 1 FROM main.SyncPeers WHERE site_id = ?",
+                                      (peer_site,)).fetchone() is None
+            if peer_site == local_site:
+                # A file copy of this database that has never synced: give it
+                # its own identity so the two histories can be told apart,
+                # and start both from the point where they were copied
+                peer_site = uuid.uuid4().hex
+                _set_site(conn, "peer", peer_site)
+                copied_at = _copy_point(conn)
+                _mark_synced(conn, "main", peer_site, copied_at)
+                _mark_synced(conn, "peer", local_site, copied_at)
+            if full:
+                if first_sync:
+                    result.split = _split_reused_uids(conn)
+                _log_all_rows(conn, "main")
+                _log_all_rows(conn, "peer")
+
+            incoming = _changes(conn, "peer", _received_seq(conn, "main", peer_site), local_site)
+            outgoing = _changes(conn, "main", _received_seq(conn, "peer", local_site), peer_site)
+            peer_seq = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM peer.ChangeLog").fetchone()[0]
+            local_seq = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM main.ChangeLog").fetchone()[0]
+
+            # Rows changed on both sides: fine if they ended up the same,
+            # otherwise a conflict unless one side is preferred
+            for key in incoming.keys() & outgoing.keys():
+                if _get_row(conn, "main", *key) == _get_row(conn, "peer", *key):
+                    del incoming[key], outgoing[key]
+                elif prefer == "local":
+                    del incoming[key]
+                elif prefer == "remote":
+                    del outgoing[key]
+                else:
+                    del incoming[key], outgoing[key]
+                    _record_conflict(conn, peer_site, *key, result)
+
+            result.received = _apply_all(conn, "peer", "main", incoming, peer_site, result, peer_site)
+            result.sent = _apply_all(conn, "main", "peer", outgoing, local_site, result, peer_site)
+            _mark_synced(conn, "main", peer_site, peer_seq)
+            _mark_synced(conn, "peer", local_site, local_seq)
+            db.set_audit_actor(conn, None, "peer")
+    finally:
+        conn.execute("DETACH DATABASE peer")
+    if result.received:
+        cache.visit_histories.clear()
+    return result
+
+
+def get_conflicts(include_resolved=False):
+    return db.query(f"""
+        SELECT id, detected_at, table_name, row_key, local_row, remote_row FROM SyncConflicts
+        {"" if include_resolved else "WHERE resolved = 0"} ORDER BY id
+    """)
+
+
+def resolve_conflict(conflict_id):
+    db.execute("UPDATE SyncConflicts SET resolved = 1 WHERE id = ?", (conflict_id,))
@@ -0,0 +1,285 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sqlite3
+from functools import partial
+
+from clinic import changes, db, open_database, patients, startup
+from clinic.ui.paged_tree import PagedTreeview
+from clinic.ui.worker import QueryWorker
+from clinic.ui.theme import (BG_COLOR, configure_styles, create_styled_button,
+                             create_styled_label, create_styled_entry)
+from clinic.ui.audit_history import open_audit_history
+from clinic.ui.backup_dialog import open_backup_dialog
+from clinic.ui.batch_visits import open_batch_visits
+from clinic.ui.column_controls import ColumnControls
+from clinic.ui.dashboard import open_dashboard
+from clinic.ui.duplicates import open_duplicates
+from clinic.ui.diagnostics import open_diagnostics
+from clinic.ui.export_dialog import open_export_dialog
+from clinic.ui.import_dialog import open_import_dialog
+from clinic.ui.patient_form import open_patient_form
+from clinic.ui.report_dialog import open_report_dialog
+from clinic.ui.visit_history import open_visit_history
+from clinic.ui.worklist import open_worklist
+
+SEARCH_DEBOUNCE_MS = 250
+CHANGE_POLL_MS = 2000              # how often to look for other workstations' changes
+
+class ClinicApp:
+    # Main patient window. All database work goes through the service
+    # modules on the two workers; the dialogs get this object so they can
+    # reach the workers and refresh the patient list.
+
+    def __init__(self, root):
+        self.root = root
+        root.title("MBG Clinic - Patient Manager")
+        root.geometry("1000x600")
+        root.configure(bg=BG_COLOR)
+
+        # Background threads for database work so the UI never waits on SQLite:
+        # one for interactive queries and one for long-running imports/exports
+        self.worker = QueryWorker(root)
+        self.jobs = QueryWorker(root)
+        self._search_after_id = None
+
+        # Open windows register here to hear which tables another
+        # workstation (or a background job) changed
+        self._change_listeners = []
+        self._table_versions = None
+        self._change_poll_id = root.after(CHANGE_POLL_MS, self.poll_changes)
+
+        # Search frame
+        search_frame = tk.Frame(root, bg=BG_COLOR)
+        search_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.search_var = tk.StringVar()
+        self.search_var.trace("w", self.schedule_search)
+
+        create_styled_label(search_frame, "Search:").pack(side=tk.LEFT, padx=5)
+        search_entry = create_styled_entry(search_frame)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.configure(textvariable=self.search_var, width=40)
+
+        # Main treeview frame
+        tree_frame = tk.Frame(root, bg=BG_COLOR)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        cols = patients.HEADINGS
+        self.tree = ttk.Treeview(tree_frame, columns=cols, show="headings", style="Custom.Treeview")
+        for col in cols:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=150)
+
+        # Add scrollbar
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Only a few pages of patients live in the tree at once; more are fetched
+        # in the current sort order as the user scrolls
+        self.patient_list = PagedTreeview(self.tree, scrollbar,
+                                          fetch_page=patients.get_patients_page,
+                                          key_for_row=patients.sort_key("mrn"),
+                                          iid_for_row=lambda row: row[0],
+                                          page_size=patients.PAGE_SIZE,
+                                          worker=self.worker)
+
+        # Sorting and filtering are done by the database, see patients.SORTS
+        self.columns = ColumnControls(root, self.tree, patients.COLUMNS, cols,
+                                      on_change=self.show_patients, sort="mrn")
+        self.columns.frame.pack(fill=tk.X, padx=10, before=tree_frame)
+
+        # Button frame
+        btn_frame = tk.Frame(root, bg=BG_COLOR)
+        btn_frame.pack(pady=10, fill=tk.X)  # Make frame fill width
+
+        # Create two rows of buttons for better layout
+        row1_buttons = [
+            ("Refresh", self.show_patients),
+            ("Add Patient", lambda: open_patient_form(self)),
+            ("Edit Patient", self.on_edit_patient),
+            ("Delete Patient", self.on_delete_patient),
+            ("View Visits", self.open_selected_patient_history),
+            ("History", self.open_selected_patient_audit),
+            ("Batch Visits", lambda: open_batch_visits(self)),
+            ("Duplicates", lambda: open_duplicates(self))
+        ]
+
+        row2_buttons = [
+            ("Import", lambda: open_import_dialog(self)),
+            ("Export", lambda: open_export_dialog(self)),
+            ("Reports", lambda: open_report_dialog(self)),
+            ("Dashboard", lambda: open_dashboard(self)),
+            ("Worklist", lambda: open_worklist(self)),
+            ("Backup", lambda: open_backup_dialog(self)),
+            ("Diagnostics", lambda: open_diagnostics(self))
+        ]
+
+        # Add first row of buttons
+        for i, (text, cmd) in enumerate(row1_buttons):
+            btn = create_styled_button(btn_frame, text, cmd)
+            btn.grid(row=0, column=i, padx=5, pady=2)
+            btn.configure(width=12)
+
+        # Add second row of buttons
+        for i, (text, cmd) in enumerate(row2_buttons):
+            btn = create_styled_button(btn_frame, text, cmd)
+            btn.grid(row=1, column=i, padx=5, pady=2)
+            btn.configure(width=12)
+
+        configure_styles()
+
+    def schedule_search(self, *args):
+        # Wait for a pause in typing rather than querying on every keystroke
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.search_patients)
+
+    def search_patients(self):
+        self._search_after_id = None
+        self.show_patients()
+
+    def show_patients(self):
+        # With a search term the tree holds only the ranked matches; otherwise
+        # it pages through every patient. Either way the query runs on the
+        # worker and supersedes any search still in flight.
+        search_term = self.search_var.get().strip()
+        sort, descending, filters = self.columns.sort, self.columns.descending, self.columns.filters
+        if search_term:
+            # Search results stay in relevance order until a heading is clicked
+            self.patient_list.show_query(patients.search_patients, search_term, patients.SEARCH_LIMIT,
+                                         None if self._sort_is_default() else sort, descending, filters)
+        else:
+            self.patient_list.set_source(partial(patients.get_patients_page, sort=sort,
+                                                 descending=descending, filters=filters),
+                                         patients.sort_key(sort), descending)
+            self.patient_list.reload()
+
+    def _sort_is_default(self):
+        return self.columns.sort == "mrn" and not self.columns.descending
+
+    def on_patient_saved(self, row):
+        # With filters on, the saved row may no longer belong in the list, so
+        # re-read the loaded window instead of placing the row ourselves
+        if self.columns.filters or self.search_var.get().strip():
+            self.patient_list.refresh()
+        else:
+            self.patient_list.upsert_row(row)
+
+    def add_change_listener(self, callback):
+        # callback(tables) is called on the Tk thread with the set of changed
+        # table names; returns a function that unregisters it
+        self._change_listeners.append(callback)
+        return lambda: self._change_listeners.remove(callback)
+
+    def poll_changes(self):
+        # PRAGMA data_version on the worker is all this costs while nothing
+        # changes; the change counters are only read after it moves. A poll
+        # that fails (e.g. the file is locked) is simply tried again next tick.
+        self._change_poll_id = self.root.after(CHANGE_POLL_MS, self.poll_changes)
+        self.check_changes()
+
+    def check_changes(self):
+        # One poll now, e.g. right after a job on the jobs worker committed,
+        # so open windows don't wait for the next tick
+        self.worker.submit(changes.poll, key="change_poll", on_done=self._apply_changes,
+                           on_error=lambda error: None)
+
+    def _apply_changes(self, versions):
+        if versions is None:
+            return
+        previous, self._table_versions = self._table_versions, versions
+        if previous is None:
+            return          # first poll only records the baseline
+        tables = changes.changed_tables(previous, versions)
+        if not tables:
+            return
+        if "Patients" in tables:
+            self.patient_list.refresh()
+        for callback in list(self._change_listeners):
+            callback(tables)
+
+    def get_selected_patient(self):
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showinfo("Select Patient", "Please select a patient.")
+            return None
+        # Rows are keyed by MRN; reading it from the iid keeps leading zeros that
+        # Tk strips when it converts the displayed values
+        item = self.tree.item(selected[0])
+        values = item["values"]
+        return {
+            "mrn": selected[0],
+            "first_name": values[1],
+            "last_name": values[2],
+            "age": values[3],
+            "translator": values[4]
+        }
+
+    def open_selected_patient_history(self):
+        patient = self.get_selected_patient()
+        if patient:
+            full_name = f"{patient['first_name']} {patient['last_name']}"
+            open_visit_history(self, patient['mrn'], full_name)
+
+    def open_selected_patient_audit(self):
+        patient = self.get_selected_patient()
+        if patient:
+            open_audit_history(self, patient['mrn'], f"{patient['first_name']} {patient['last_name']}")
+
+    def on_edit_patient(self):
+        patient = self.get_selected_patient()
+        if patient:
+            open_patient_form(self, existing=patient)
+
+    def on_delete_patient(self):
+        patient = self.get_selected_patient()
+        if not patient:
+            return
+        confirm = messagebox.askyesno("Delete Patient", f"Are you sure you want to delete {patient['first_name']} {patient['last_name']}?")
+        if not confirm:
+            return
+
+        def failed(error):
+            if isinstance(error, sqlite3.IntegrityError):
+                messagebox.showerror("Error", "Cannot delete patient with visit history.")
+            else:
+                messagebox.showerror("Database Error", str(error))
+
+        self.worker.submit(patients.delete_patient, patient["mrn"],
+                           on_done=lambda _: self.patient_list.remove_row(patient["mrn"]),
+                           on_error=failed)
+
+    def close(self):
+        try:
+            self.root.after_cancel(self._change_poll_id)
+        except tk.TclError:
+            pass
+        self.worker.stop()
+        self.jobs.stop()
+        db.close_all()
+
+def run(db_path=None, profile_startup=False):
+    open_database(db_path)
+    startup.mark("database")
+
+    root = tk.Tk()
+    app = ClinicApp(root)
+
+    # Show initial data
+    app.show_patients()
+    startup.mark("window built")
+
+    if profile_startup:
+        # Report timings and exit once the window has been drawn
+        def first_paint():
+            root.update_idletasks()
+            startup.mark("first paint")
+            startup.print_profile()
+            root.destroy()
+        root.after_idle(first_paint)
+
+    try:
+        root.mainloop()
+    finally:
+        app.close()
@@ -0,0 +1,70 @@
+import tkinter as tk
+from tkinter import ttk
+
+from clinic import audit
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+
+def open_audit_history(app, mrn, patient_name):
+    win = tk.Toplevel(app.root)
+    win.title(f"Change History - {patient_name}")
+    win.configure(bg=BG_COLOR)
+    win.geometry("1200x600")
+
+    summary = create_styled_label(win, "")
+    summary.pack(fill=tk.X, padx=25, pady=(20, 5), anchor="w")
+
+    tree_frame = tk.Frame(win, bg=BG_COLOR)
+    tree_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+    tree = ttk.Treeview(tree_frame, columns=audit.HEADINGS, show="headings", style="Custom.Treeview")
+    for col in audit.HEADINGS:
+        tree.heading(col, text=col)
+        tree.column(col, width=130)
+    tree.column("Who", width=200)
+    tree.column("Changes", width=500)
+    scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    # Items are keyed by audit_id; the smallest shown is where "Load Older"
+    # continues from
+    oldest = [None]
+
+    def show(rows, append):
+        if not win.winfo_exists():
+            return
+        if not append:
+            tree.delete(*tree.get_children())
+        for audit_id, *values in rows:
+            tree.insert("", tk.END, iid=audit_id, values=values)
+        if rows:
+            oldest[0] = rows[-1][0]
+        older_btn.config(state="normal" if len(rows) == audit.HISTORY_LIMIT else "disabled")
+        count = len(tree.get_children())
+        summary.config(text=f"{count} changes shown, newest first" if count
+                       else "No changes recorded for this patient yet.")
+
+    def refresh():
+        oldest[0] = None
+        app.worker.submit(audit.get_patient_history, mrn, key=("audit", str(win)),
+                          on_done=lambda rows: show(rows, append=False))
+
+    def load_older():
+        app.worker.submit(audit.get_patient_history, mrn, oldest[0], key=("audit", str(win)),
+                          on_done=lambda rows: show(rows, append=True))
+
+    def on_external_change(tables):
+        if tables & {"Patients", "Visits", "Followups"} and win.winfo_exists():
+            refresh()
+
+    remove_listener = app.add_change_listener(on_external_change)
+    win.bind("<Destroy>", lambda event: remove_listener() if event.widget is win else None)
+
+    button_frame = tk.Frame(win, bg=BG_COLOR)
+    button_frame.pack(fill=tk.X, padx=20, pady=(5, 15))
+    older_btn = create_styled_button(button_frame, "Load Older", load_older)
+    older_btn.pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Refresh", refresh).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
+
+    refresh()
@@ -0,0 +1,81 @@
+import os
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from clinic import backup
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+
+def open_backup_dialog(app):
+    win = tk.Toplevel(app.root)
+    win.title("Backup")
+    win.configure(bg=BG_COLOR)
+
+    create_styled_label(win, f"Snapshots are saved in {os.path.abspath(backup.BACKUP_DIR)}; "
+                             f"the newest {backup.KEEP} are kept.").grid(
+        row=0, column=0, columnspan=3, padx=10, pady=5, sticky="w")
+
+    compact_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(win, text="Compact copy (VACUUM INTO: smaller file, takes longer)",
+                   variable=compact_var, bg=BG_COLOR, font=("Arial", 11)).grid(
+        row=1, column=0, columnspan=3, padx=10, pady=5, sticky="w")
+
+    progress = ttk.Progressbar(win, length=420, maximum=1.0)
+    progress.grid(row=2, column=0, columnspan=3, padx=10, pady=5)
+    status = create_styled_label(win, "")
+    status.grid(row=3, column=0, columnspan=3, padx=10, pady=5, sticky="w")
+
+    cancel_event = threading.Event()
+
+    def update_progress(fraction):
+        if win.winfo_exists():
+            progress["value"] = fraction
+
+    def set_running(running, cancellable=False):
+        if win.winfo_exists():
+            for btn in (snapshot_btn, export_btn):
+                btn.config(state="disabled" if running else "normal")
+            cancel_btn.config(state="normal" if cancellable else "disabled")
+
+    def done(path):
+        set_running(False)
+        if win.winfo_exists():
+            status.config(text=f"Saved and verified: {path}")
+
+    def failed(error):
+        set_running(False)
+        if isinstance(error, backup.BackupCancelled):
+            if win.winfo_exists():
+                status.config(text="Backup cancelled.")
+                progress["value"] = 0
+        else:
+            messagebox.showerror("Backup Failed", str(error))
+
+    def start(fn, *args):
+        # VACUUM INTO is a single statement, so only the stepwise copy can be
+        # cancelled part way
+        cancel_event.clear()
+        set_running(True, cancellable=not compact_var.get())
+        status.config(text="Compacting..." if compact_var.get() else "Copying...")
+        # Runs on the jobs worker; the copy reads through its own connection
+        app.jobs.submit(fn, *args, compact=compact_var.get(),
+                        progress=lambda fraction: app.jobs.post(update_progress, fraction),
+                        should_cancel=cancel_event.is_set,
+                        on_done=done, on_error=failed)
+
+    def export():
+        filename = filedialog.asksaveasfilename(parent=win, defaultextension=".db",
+                                                filetypes=[("SQLite database", "*.db")])
+        if filename:
+            start(backup.export_snapshot, filename)
+
+    button_frame = tk.Frame(win, bg=BG_COLOR)
+    button_frame.grid(row=4, column=0, columnspan=3, pady=10)
+    snapshot_btn = create_styled_button(button_frame, "Back Up Now", lambda: start(backup.create_snapshot))
+    snapshot_btn.pack(side=tk.LEFT, padx=5)
+    export_btn = create_styled_button(button_frame, "Export Copy...", export)
+    export_btn.pack(side=tk.LEFT, padx=5)
+    cancel_btn = create_styled_button(button_frame, "Cancel", cancel_event.set)
+    cancel_btn.pack(side=tk.LEFT, padx=5)
+    cancel_btn.config(state="disabled")
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
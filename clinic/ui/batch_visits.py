@@ -0,0 +1,150 @@
+import tkinter as tk
+from datetime import date
+from tkinter import ttk, messagebox
+
+from clinic import visits
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label, create_styled_entry
+
+START_ROWS = 15
+MORE_ROWS = 10
+
+# Grid columns: (heading, field, width in characters)
+GRID_COLUMNS = [
+    ("MRN", "mrn", 10),
+    ("Visit Date", "visit_date", 11),
+    ("Physician", "physician", 14),
+    ("Last CX", "last_cx", 10),
+    ("Due Notes", "due_notes", 16),
+    ("OGTT", "ogtt", 8),
+    ("Opth", "opth", 8),
+    ("Modulator", "modulator", 12),
+    ("PFT", "pft", 8),
+    ("Registry", "registry", 10),
+]
+
+def open_batch_visits(app, mrn=None):
+    # Spreadsheet-style entry for a clinic day: type many visits, then save
+    # them all in one transaction (visits.add_visits). A blank visit date or
+    # physician takes the default above the grid.
+    win = tk.Toplevel(app.root)
+    win.title("Batch Visit Entry")
+    win.configure(bg=BG_COLOR)
+    win.geometry("1250x600")
+
+    defaults_frame = tk.Frame(win, bg=BG_COLOR)
+    defaults_frame.pack(fill=tk.X, padx=20, pady=(20, 5))
+    create_styled_label(defaults_frame, "Default visit date:").pack(side=tk.LEFT, padx=5)
+    default_date = create_styled_entry(defaults_frame)
+    default_date.insert(0, date.today().isoformat())
+    default_date.pack(side=tk.LEFT, padx=5)
+    create_styled_label(defaults_frame, "Default physician:").pack(side=tk.LEFT, padx=5)
+    default_physician = create_styled_entry(defaults_frame)
+    default_physician.pack(side=tk.LEFT, padx=5)
+
+    # Entry widgets in a scrollable canvas
+    grid_frame = tk.Frame(win, bg=BG_COLOR)
+    grid_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+    canvas = tk.Canvas(grid_frame, bg=BG_COLOR, highlightthickness=0)
+    scrollbar = ttk.Scrollbar(grid_frame, orient=tk.VERTICAL, command=canvas.yview)
+    canvas.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    cells_frame = tk.Frame(canvas, bg=BG_COLOR)
+    canvas.create_window((0, 0), window=cells_frame, anchor="nw")
+    cells_frame.bind("<Configure>", lambda event: canvas.configure(scrollregion=canvas.bbox("all")))
+
+    for col, (heading, _, _) in enumerate(GRID_COLUMNS):
+        create_styled_label(cells_frame, heading).grid(row=0, column=col + 1, padx=2, sticky="w")
+    rows = []           # one {field: Entry} per grid row
+
+    def move_down(row_index, col):
+        # Enter moves down the column, like a spreadsheet
+        if row_index + 1 == len(rows):
+            add_rows(MORE_ROWS)
+        rows[row_index + 1][GRID_COLUMNS[col][1]].focus_set()
+        return "break"
+
+    def add_rows(count):
+        for _ in range(count):
+            row_index = len(rows)
+            tk.Label(cells_frame, text=str(row_index + 1), bg=BG_COLOR, fg="grey",
+                     font=("Arial", 9)).grid(row=row_index + 1, column=0, padx=(0, 4), sticky="e")
+            cells = {}
+            for col, (_, field, width) in enumerate(GRID_COLUMNS):
+                entry = create_styled_entry(cells_frame)
+                entry.configure(width=width)
+                entry.grid(row=row_index + 1, column=col + 1, padx=1, pady=1)
+                entry.bind("<Return>", lambda event, r=row_index, c=col: move_down(r, c))
+                cells[field] = entry
+            if mrn:
+                cells["mrn"].insert(0, mrn)
+            rows.append(cells)
+
+    def grid_values():
+        # Every grid row, blank ones included so that row numbers in errors
+        # match the grid; defaults only fill rows the user typed into. The
+        # MRN filled in for the patient doesn't count as typing.
+        result = []
+        for cells in rows:
+            values = {field: entry.get().strip() for field, entry in cells.items()}
+            typed = {field: value for field, value in values.items()
+                     if not (field == "mrn" and value == mrn)}
+            if not any(typed.values()):
+                values = {field: "" for field in values}
+            if any(values.values()):
+                values["visit_date"] = values["visit_date"] or default_date.get().strip()
+                values["physician"] = values["physician"] or default_physician.get().strip()
+            result.append(values)
+        return result
+
+    def clear():
+        for cells in rows:
+            for entry in cells.values():
+                entry.delete(0, tk.END)
+            if mrn:
+                cells["mrn"].insert(0, mrn)
+        status.config(text="")
+
+    def saved(visit_ids):
+        set_saving(False)
+        # Open visit histories and the dashboard refresh once for the batch
+        app.check_changes()
+        if win.winfo_exists():
+            clear()
+            status.config(text=f"{len(visit_ids)} visits saved.")
+
+    def failed(error):
+        set_saving(False)
+        if isinstance(error, ValueError):
+            messagebox.showerror("Batch Not Saved", f"Nothing was saved:\n{error}", parent=win)
+        else:
+            messagebox.showerror("Database Error", str(error), parent=win)
+
+    def set_saving(saving):
+        if win.winfo_exists():
+            save_btn.config(state="disabled" if saving else "normal")
+
+    def save():
+        values = grid_values()
+        count = sum(1 for row in values if any(row.values()))
+        if not count:
+            messagebox.showinfo("Batch Visit Entry", "There are no visits to save.", parent=win)
+            return
+        set_saving(True)
+        status.config(text=f"Saving {count} visits...")
+        app.jobs.submit(visits.add_visits, values, on_done=saved, on_error=failed)
+
+    # Opened for one patient, every row starts with their MRN
+    add_rows(START_ROWS)
+    if mrn:
+        rows[0]["visit_date"].focus_set()
+
+    button_frame = tk.Frame(win, bg=BG_COLOR)
+    button_frame.pack(fill=tk.X, padx=20, pady=(5, 15))
+    save_btn = create_styled_button(button_frame, "Save All", save)
+    save_btn.pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Add Rows", lambda: add_rows(MORE_ROWS)).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Clear", clear).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
+    status = create_styled_label(button_frame, "")
+    status.pack(side=tk.LEFT, padx=10)
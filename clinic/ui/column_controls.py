@@ -0,0 +1,67 @@
+import tkinter as tk
+
+from clinic.ui.theme import BG_COLOR, create_styled_entry, create_styled_label
+
+FILTER_DEBOUNCE_MS = 300
+ARROWS = {False: " ▲", True: " ▼"}
+
+class ColumnControls:
+    # Clickable headings plus a row of per-column filter boxes for a Treeview
+    # whose sorting and filtering are done by the database. Clicking a
+    # heading sorts by that column, clicking it again reverses the order;
+    # filters apply once typing pauses. Either way on_change() is called and
+    # the owner re-queries using .sort, .descending and .filters.
+    #
+    # columns are the service-layer column names, tree_columns the matching
+    # Treeview column ids (the headings).
+
+    def __init__(self, parent, tree, columns, tree_columns, on_change,
+                 sort=None, descending=False):
+        self.tree = tree
+        self.tree_columns = dict(zip(columns, tree_columns))
+        self.on_change = on_change
+        self.sort = sort
+        self.descending = descending
+        self._filter_vars = {}
+        self._after_id = None
+
+        self.frame = tk.Frame(parent, bg=BG_COLOR)
+        create_styled_label(self.frame, "Filter by column (starts with):").grid(
+            row=0, column=0, columnspan=len(columns), sticky="w")
+        for i, column in enumerate(columns):
+            var = tk.StringVar()
+            var.trace_add("write", self._schedule)
+            entry = create_styled_entry(self.frame)
+            entry.configure(textvariable=var, width=1)
+            entry.grid(row=1, column=i, sticky="ew", padx=1)
+            self.frame.grid_columnconfigure(i, weight=1, uniform="filters")
+            self._filter_vars[column] = var
+            tree.heading(self.tree_columns[column], command=lambda c=column: self.sort_by(c))
+        self._update_headings()
+
+    @property
+    def filters(self):
+        return {column: var.get() for column, var in self._filter_vars.items() if var.get().strip()}
+
+    def sort_by(self, column):
+        if column == self.sort:
+            self.descending = not self.descending
+        else:
+            self.sort = column
+            self.descending = False
+        self._update_headings()
+        self.on_change()
+
+    def _update_headings(self):
+        for column, tree_column in self.tree_columns.items():
+            arrow = ARROWS[self.descending] if column == self.sort else ""
+            self.tree.heading(tree_column, text=tree_column + arrow)
+
+    def _schedule(self, *args):
+        if self._after_id is not None:
+            self.frame.after_cancel(self._after_id)
+        self._after_id = self.frame.after(FILTER_DEBOUNCE_MS, self._filters_changed)
+
+    def _filters_changed(self):
+        self._after_id = None
+        self.on_change()
@@ -0,0 +1,86 @@
+import tkinter as tk
+from tkinter import ttk
+
+from clinic import dashboard
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+
+def _make_tree(parent, title, cols, height=8):
+    frame = tk.Frame(parent, bg=BG_COLOR)
+    create_styled_label(frame, title).pack(anchor="w")
+    tree = ttk.Treeview(frame, columns=cols, show="headings", height=height, style="Custom.Treeview")
+    for col in cols:
+        tree.heading(col, text=col)
+        tree.column(col, width=90, anchor="e")
+    tree.column(cols[0], width=140, anchor="w")
+    tree.pack(fill=tk.BOTH, expand=True)
+    return frame, tree
+
+def _fill(tree, rows):
+    tree.delete(*tree.get_children())
+    for row in rows:
+        tree.insert("", tk.END, values=row)
+
+def open_dashboard(app):
+    win = tk.Toplevel(app.root)
+    win.title("Clinic Dashboard")
+    win.configure(bg=BG_COLOR)
+    win.geometry("1200x650")
+
+    main_frame = tk.Frame(win, bg=BG_COLOR)
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+    main_frame.grid_columnconfigure(0, weight=1)
+    main_frame.grid_columnconfigure(1, weight=1)
+    main_frame.grid_rowconfigure(0, weight=1)
+    main_frame.grid_rowconfigure(1, weight=1)
+
+    # Visits per physician per month, as a physician x month grid; the month
+    # columns are set when the data arrives
+    monthly_frame = tk.Frame(main_frame, bg=BG_COLOR)
+    monthly_frame.grid(row=0, column=0, columnspan=2, sticky="nsew", pady=(0, 10))
+    create_styled_label(monthly_frame, f"Visits per physician, last {dashboard.MONTHS} months").pack(anchor="w")
+    monthly = ttk.Treeview(monthly_frame, show="headings", height=8, style="Custom.Treeview")
+    monthly.pack(fill=tk.BOTH, expand=True)
+
+    frame, modulators = _make_tree(main_frame, "Modulator usage (visits)", ("Modulator", "Visits"))
+    frame.grid(row=1, column=0, sticky="nsew", padx=(0, 10))
+    frame, registry = _make_tree(main_frame, "Registry consent (visits)", ("Registry", "Visits"))
+    frame.grid(row=1, column=1, sticky="nsew")
+    frame, overdue = _make_tree(main_frame, "Overdue follow-ups (patients)", ("Physician", "Overdue"))
+    frame.grid(row=0, column=2, rowspan=2, sticky="nsew", padx=(10, 0))
+
+    def show(data):
+        if not win.winfo_exists():
+            return
+        months = sorted({month for _, month, _ in data["visits_by_month"]})
+        by_physician = {}
+        for physician, month, visits in data["visits_by_month"]:
+            by_physician.setdefault(physician, {})[month] = visits
+        cols = ("Physician",) + tuple(months) + ("Total",)
+        monthly.configure(columns=cols)
+        for col in cols:
+            monthly.heading(col, text=col)
+            monthly.column(col, width=70, anchor="e")
+        monthly.column("Physician", width=140, anchor="w")
+        _fill(monthly, [(physician, *(counts.get(month, 0) for month in months), sum(counts.values()))
+                        for physician, counts in sorted(by_physician.items())])
+        _fill(modulators, [(value or "(blank)", visits) for value, visits in data["modulators"]])
+        _fill(registry, [(value or "(blank)", visits) for value, visits in data["registry"]])
+        _fill(overdue, data["overdue"])
+
+    def refresh():
+        app.worker.submit(dashboard.get_dashboard, key=("dashboard", str(win)), on_done=show)
+
+    # Summary tables only change with visits and follow-ups
+    def on_external_change(tables):
+        if tables & {"Visits", "Followups"} and win.winfo_exists():
+            refresh()
+
+    remove_listener = app.add_change_listener(on_external_change)
+    win.bind("<Destroy>", lambda event: remove_listener() if event.widget is win else None)
+
+    button_frame = tk.Frame(win, bg=BG_COLOR)
+    button_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
+    create_styled_button(button_frame, "Refresh", refresh).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
+
+    refresh()
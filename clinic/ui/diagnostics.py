@@ -0,0 +1,66 @@
+import tkinter as tk
+from tkinter import ttk
+
+from clinic import cache, instrumentation
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+
+REFRESH_MS = 2000
+
+def open_diagnostics(app):
+    win = tk.Toplevel(app.root)
+    win.title("Diagnostics - Query Statistics")
+    win.configure(bg=BG_COLOR)
+    win.geometry("1100x500")
+
+    main_frame = tk.Frame(win, bg=BG_COLOR)
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+    summary = create_styled_label(main_frame, "")
+    summary.pack(anchor="w", pady=(0, 5))
+
+    tree_frame = tk.Frame(main_frame, bg=BG_COLOR)
+    tree_frame.pack(fill=tk.BOTH, expand=True)
+
+    cols = ("Calls", "Total ms", "Avg ms", "Max ms", "Rows", "Lock wait ms", "Slow", "SQL")
+    tree = ttk.Treeview(tree_frame, columns=cols, show="headings", style="Custom.Treeview")
+    for col in cols:
+        tree.heading(col, text=col)
+        tree.column(col, width=80, anchor="e")
+    tree.column("SQL", width=500, anchor="w")
+
+    scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def refresh():
+        if not win.winfo_exists():
+            return
+        # Stats live in memory, so this never touches the database
+        stats = instrumentation.get_stats()
+        tree.delete(*tree.get_children())
+        for s in stats:
+            tree.insert("", tk.END, values=(s["calls"], f"{s['total_ms']:.1f}", f"{s['avg_ms']:.2f}",
+                                            f"{s['max_ms']:.1f}", s["rows"], f"{s['lock_wait_ms']:.1f}",
+                                            s["slow"], s["sql"]))
+        calls = sum(s["calls"] for s in stats)
+        total = sum(s["total_ms"] for s in stats)
+        wait = sum(s["lock_wait_ms"] for s in stats)
+        c = cache.visit_histories.stats()
+        summary.config(text=f"{calls:,} statements, {total:,.0f} ms in SQLite, {wait:,.0f} ms waiting on locks/I/O. "
+                            f"Statements over {instrumentation.SLOW_QUERY_MS} ms are logged to "
+                            f"{instrumentation.SLOW_QUERY_LOG}.\n"
+                            f"Visit history cache: {c['size']}/{c['maxsize']} patients, "
+                            f"{c['hits']:,} hits, {c['misses']:,} misses")
+        win.after(REFRESH_MS, refresh)
+
+    def reset():
+        instrumentation.reset_stats()
+        tree.delete(*tree.get_children())
+
+    button_frame = tk.Frame(main_frame, bg=BG_COLOR)
+    button_frame.pack(fill=tk.X, pady=(10, 0))
+    create_styled_button(button_frame, "Reset", reset).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
+
+    refresh()
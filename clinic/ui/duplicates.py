@@ -0,0 +1,119 @@
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from clinic import duplicates
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+
+HEADINGS = ("Score", "MRN A", "Name A", "Age A", "Translator A",
+            "MRN B", "Name B", "Age B", "Translator B")
+
+def open_duplicates(app):
+    win = tk.Toplevel(app.root)
+    win.title("Possible Duplicate Patients")
+    win.configure(bg=BG_COLOR)
+    win.geometry("1100x600")
+
+    status = create_styled_label(win, "Press Find to look for patients entered twice.")
+    status.pack(fill=tk.X, padx=25, pady=(20, 5), anchor="w")
+    progress = ttk.Progressbar(win, length=360, maximum=1.0)
+    progress.pack(padx=20, anchor="w")
+
+    tree_frame = tk.Frame(win, bg=BG_COLOR)
+    tree_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+    tree = ttk.Treeview(tree_frame, columns=HEADINGS, show="headings", style="Custom.Treeview",
+                        selectmode="browse")
+    for col in HEADINGS:
+        tree.heading(col, text=col)
+        tree.column(col, width=110)
+    tree.column("Score", width=60)
+    tree.column("Name A", width=180)
+    tree.column("Name B", width=180)
+    scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    cancel_event = threading.Event()
+    pairs = {}
+
+    def update_progress(fraction):
+        if win.winfo_exists():
+            progress["value"] = fraction
+
+    def set_running(running):
+        if win.winfo_exists():
+            find_btn.config(state="disabled" if running else "normal")
+            cancel_btn.config(state="normal" if running else "disabled")
+
+    def show(found):
+        set_running(False)
+        if not win.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        pairs.clear()
+        for i, (pair_score, a, b) in enumerate(found):
+            pairs[str(i)] = (a, b)
+            tree.insert("", tk.END, iid=str(i), values=(
+                f"{pair_score:.2f}", a[0], f"{a[1]} {a[2]}", a[3], a[4],
+                b[0], f"{b[1]} {b[2]}", b[3], b[4]))
+        progress["value"] = 1.0
+        status.config(text=f"{len(found)} possible duplicates" if found
+                      else "No likely duplicates found.")
+
+    def failed(error):
+        set_running(False)
+        if isinstance(error, duplicates.DuplicatesCancelled):
+            if win.winfo_exists():
+                status.config(text="Search cancelled")
+                progress["value"] = 0
+        else:
+            messagebox.showerror("Error", f"Failed to find duplicates: {str(error)}", parent=win)
+
+    def find():
+        cancel_event.clear()
+        set_running(True)
+        status.config(text="Searching...")
+        app.jobs.submit(duplicates.find_duplicates,
+                        progress=lambda fraction: app.jobs.post(update_progress, fraction),
+                        should_cancel=cancel_event.is_set,
+                        on_done=show, on_error=failed)
+
+    def merge(keep_side):
+        selected = tree.selection()
+        if not selected:
+            messagebox.showerror("Error", "Select a pair to merge", parent=win)
+            return
+        iid = selected[0]
+        keep, drop = pairs[iid] if keep_side == 0 else reversed(pairs[iid])
+        if not messagebox.askyesno(
+                "Merge Patients",
+                f"Move all visits of {drop[1]} {drop[2]} (MRN {drop[0]}) to "
+                f"{keep[1]} {keep[2]} (MRN {keep[0]}) and delete MRN {drop[0]}?", parent=win):
+            return
+
+        def merged(moved):
+            if win.winfo_exists():
+                # Other pairs with the dropped MRN are stale now
+                for other, (a, b) in list(pairs.items()):
+                    if drop[0] in (a[0], b[0]):
+                        tree.delete(other)
+                        del pairs[other]
+                status.config(text=f"Merged MRN {drop[0]} into {keep[0]} ({moved} visits moved)")
+            app.check_changes()
+
+        # On the jobs worker like batch visits: check_changes() polls from the
+        # query worker, which only sees commits made by other connections
+        app.jobs.submit(duplicates.merge_patients, keep[0], drop[0], on_done=merged,
+                        on_error=lambda error: messagebox.showerror("Error", str(error), parent=win))
+
+    button_frame = tk.Frame(win, bg=BG_COLOR)
+    button_frame.pack(fill=tk.X, padx=20, pady=(5, 15))
+    find_btn = create_styled_button(button_frame, "Find", find)
+    find_btn.pack(side=tk.LEFT, padx=5)
+    cancel_btn = create_styled_button(button_frame, "Cancel", cancel_event.set)
+    cancel_btn.pack(side=tk.LEFT, padx=5)
+    cancel_btn.config(state="disabled")
+    create_styled_button(button_frame, "Keep A", lambda: merge(0)).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Keep B", lambda: merge(1)).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
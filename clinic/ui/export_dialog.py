@@ -0,0 +1,77 @@
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from clinic import export
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+
+def open_export_dialog(app):
+    win = tk.Toplevel(app.root)
+    win.title("Export Data")
+    win.configure(bg=BG_COLOR)
+
+    create_styled_label(win, "Export tables (one CSV file each):").grid(
+        row=0, column=0, columnspan=3, padx=10, pady=5, sticky="w")
+    table_vars = {}
+    for i, table in enumerate(export.EXPORT_TABLES):
+        table_vars[table] = tk.BooleanVar(value=True)
+        tk.Checkbutton(win, text=table, variable=table_vars[table], bg=BG_COLOR,
+                       font=("Arial", 11)).grid(row=1, column=i, padx=10, pady=2, sticky="w")
+    compress_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(win, text="Compress (.csv.gz)", variable=compress_var, bg=BG_COLOR,
+                   font=("Arial", 11)).grid(row=2, column=0, columnspan=3, padx=10, pady=5, sticky="w")
+
+    progress = ttk.Progressbar(win, length=360, maximum=1.0)
+    progress.grid(row=3, column=0, columnspan=3, padx=10, pady=5)
+    status = create_styled_label(win, "")
+    status.grid(row=4, column=0, columnspan=3, padx=10, pady=5)
+
+    cancel_event = threading.Event()
+
+    def update_progress(written, total):
+        if win.winfo_exists():
+            progress["value"] = written / total if total else 1.0
+            status.config(text=f"{written:,} of {total:,} rows written")
+
+    def set_running(running):
+        if win.winfo_exists():
+            export_btn.config(state="disabled" if running else "normal")
+            cancel_btn.config(state="normal" if running else "disabled")
+
+    def done(paths):
+        set_running(False)
+        messagebox.showinfo("Export Complete", "Written:\n" + "\n".join(paths.values()))
+
+    def failed(error):
+        set_running(False)
+        if isinstance(error, export.ExportCancelled):
+            if win.winfo_exists():
+                status.config(text="Export cancelled")
+                progress["value"] = 0
+        else:
+            messagebox.showerror("Error", f"Failed to export: {str(error)}")
+
+    def start():
+        tables = [table for table, var in table_vars.items() if var.get()]
+        if not tables:
+            messagebox.showerror("Error", "Select at least one table", parent=win)
+            return
+        directory = filedialog.askdirectory(parent=win, title="Export to folder")
+        if not directory:
+            return
+        cancel_event.clear()
+        set_running(True)
+        # Streams on the jobs worker; progress is posted back to the Tk thread
+        app.jobs.submit(export.export_all, directory, tables, compress_var.get(),
+                        progress=lambda *args: app.jobs.post(update_progress, *args),
+                        should_cancel=cancel_event.is_set,
+                        on_done=done, on_error=failed)
+
+    button_frame = tk.Frame(win, bg=BG_COLOR)
+    button_frame.grid(row=5, column=0, columnspan=3, pady=10)
+    export_btn = create_styled_button(button_frame, "Export...", start)
+    export_btn.pack(side=tk.LEFT, padx=5)
+    cancel_btn = create_styled_button(button_frame, "Cancel", cancel_event.set)
+    cancel_btn.pack(side=tk.LEFT, padx=5)
+    cancel_btn.config(state="disabled")
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
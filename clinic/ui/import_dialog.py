@@ -0,0 +1,53 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from clinic import importer
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+
+def open_import_dialog(app):
+    win = tk.Toplevel(app.root)
+    win.title("Import CSV")
+    win.configure(bg=BG_COLOR)
+
+    table_var = tk.StringVar(value="Patients")
+    create_styled_label(win, "Import into:").grid(row=0, column=0, padx=10, pady=5, sticky="e")
+    for i, table in enumerate(importer.IMPORT_TABLES):
+        tk.Radiobutton(win, text=table, variable=table_var, value=table,
+                       bg=BG_COLOR, font=("Arial", 11)).grid(row=0, column=i + 1, padx=5, pady=5, sticky="w")
+
+    progress = ttk.Progressbar(win, length=360, maximum=1.0)
+    progress.grid(row=1, column=0, columnspan=4, padx=10, pady=5)
+    status = create_styled_label(win, "")
+    status.grid(row=2, column=0, columnspan=4, padx=10, pady=5)
+
+    def update_progress(fraction, imported, rejected):
+        if win.winfo_exists():
+            progress["value"] = fraction
+            status.config(text=f"{imported:,} imported, {rejected:,} rejected")
+
+    def done(result):
+        app.show_patients()
+        message = f"{result.imported:,} {result.table} rows imported."
+        if result.rejected:
+            message += f"\n{result.rejected:,} rows rejected; see {result.reject_path}"
+        messagebox.showinfo("Import Complete", message)
+        if win.winfo_exists():
+            win.destroy()
+
+    def failed(error):
+        messagebox.showerror("Error", f"Failed to import: {str(error)}")
+        if win.winfo_exists():
+            choose_btn.config(state="normal")
+
+    def start():
+        filename = filedialog.askopenfilename(parent=win, filetypes=[("CSV files", "*.csv")])
+        if not filename:
+            return
+        choose_btn.config(state="disabled")
+        # Runs on the jobs worker; progress is posted back to the Tk thread
+        app.jobs.submit(importer.import_csv, filename, table_var.get(),
+                        progress=lambda *args: app.jobs.post(update_progress, *args),
+                        on_done=done, on_error=failed)
+
+    choose_btn = create_styled_button(win, "Choose File...", start)
+    choose_btn.grid(row=3, column=0, columnspan=4, pady=10)
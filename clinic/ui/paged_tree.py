@@ -0,0 +1,247 @@
+import bisect
+import sqlite3
+import tkinter as tk
+from tkinter import messagebox
+
+# Fraction of the scroll range at either edge that triggers loading the
+# neighbouring page
+EDGE_THRESHOLD = 0.1
+
+
+class PagedTreeview:
+    # Virtual list on top of a ttk.Treeview. Rows come from the database a
+    # page at a time using keyset pagination and only `max_pages` pages are
+    # kept as Tk items; pages that scroll far out of view are dropped and
+    # fetched again if the user scrolls back.
+    #
+    # fetch_page(cursor, forward, limit) must return rows in display order:
+    # the first `limit` rows after `cursor` when forward is True, the last
+    # `limit` rows before it otherwise. A cursor of None means "from the top".
+    # key_for_row(row) returns the cursor value for a row and iid_for_row(row)
+    # the Treeview item id. Keys increase down the list, or decrease if
+    # descending is set.
+    #
+    # With a QueryWorker every fetch runs off the Tk thread; a newer fetch
+    # (reload, search, next page) supersedes any that is still in flight.
+
+    def __init__(self, tree, scrollbar, fetch_page, key_for_row, iid_for_row,
+                 page_size=200, max_pages=3, worker=None, descending=False):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.key_for_row = key_for_row
+        self.descending = descending
+        self.iid_for_row = iid_for_row
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.worker = worker
+
+        self._keys = {}
+        self.at_start = True
+        self.at_end = True
+        self._loading = False
+        self._static = False
+        self._query = None
+        self._task_key = ("paged_tree", id(self))
+
+        tree.configure(yscrollcommand=self._on_tree_scroll)
+
+    def _run(self, callback, fn, *args):
+        if self.worker is None:
+            callback(fn(*args))
+        else:
+            self.worker.submit(fn, *args, key=self._task_key,
+                               on_done=callback, on_error=self._fetch_failed)
+
+    def _fetch_failed(self, error):
+        self._loading = False
+        title = "Database Error" if isinstance(error, sqlite3.Error) else "Error"
+        messagebox.showerror(title, str(error))
+
+    def set_source(self, fetch_page, key_for_row, descending=False):
+        # Switch to another ordering or filter of the rows; takes effect on
+        # the next reload()
+        self.fetch_page = fetch_page
+        self.key_for_row = key_for_row
+        self.descending = descending
+
+    def reload(self):
+        self._loading = False
+        self._run(self._apply_reload, self.fetch_page, None, True, self.page_size)
+
+    def show_query(self, fn, *args):
+        # Display the rows returned by fn(*args), e.g. search matches, with
+        # paging off until the next reload()
+        self._loading = False
+        self._query = (fn, args)
+        self._run(self.show, fn, *args)
+
+    def refresh(self):
+        # Re-read the rows currently loaded (or re-run the current query),
+        # e.g. after another workstation changed the data, keeping the scroll
+        # position and selection
+        if self._static and self._query is None:
+            return          # rows were handed to show(); nothing to re-run
+        self._loading = False
+        if self._static:
+            fn, args = self._query
+            self._run(self._apply_refresh, self._refetch_query, fn, args)
+        else:
+            children = self.tree.get_children()
+            first = self._keys[children[0]] if children and not self.at_start else None
+            count = max(len(children), self.page_size)
+            self._run(self._apply_refresh, self._refetch_window, first, count)
+
+    def _refetch_query(self, fn, args):
+        return fn(*args), True, True
+
+    def _refetch_window(self, first_key, count):
+        # Runs on the worker: start from the row before the first loaded one
+        # so the window begins at the same place
+        cursor = None
+        if first_key is not None:
+            before = self.fetch_page(first_key, False, 1)
+            cursor = self.key_for_row(before[-1]) if before else None
+        rows = self.fetch_page(cursor, True, count)
+        return rows, cursor is None, len(rows) < count
+
+    def _apply_refresh(self, result):
+        rows, at_start, at_end = result
+        anchor = self._top_item()
+        selection = self.tree.selection()
+        self.at_start = at_start
+        self.at_end = at_end
+        self.tree.delete(*self.tree.get_children())
+        self._keys.clear()
+        self._append(rows)
+        self.tree.selection_set([iid for iid in selection if self.tree.exists(iid)])
+        self._restore_top(anchor)
+
+    def show(self, rows):
+        self.at_start = True
+        self.at_end = True
+        self._static = True
+        self._replace(rows)
+
+    def upsert_row(self, row):
+        # Apply a single add/edit without re-querying: update the item in
+        # place, or insert it at its sorted position if it falls inside the
+        # loaded window. Rows beyond the window turn up when paged in.
+        # Selection and scroll position are left alone.
+        iid = self.iid_for_row(row)
+        key = self.key_for_row(row)
+        anchor = self._top_item()
+        if self.tree.exists(iid):
+            if self._keys.get(iid) == key or self._static:
+                self.tree.item(iid, values=row)
+                self._keys[iid] = key
+                return
+            self._drop([iid])
+        elif self._static:
+            return
+
+        children = self.tree.get_children()
+        keys = [self._keys[child] for child in children]
+        if self.descending:
+            index = len(keys) - bisect.bisect_right(keys[::-1], key)
+        else:
+            index = bisect.bisect_left(keys, key)
+        if children and ((index == 0 and not self.at_start) or
+                         (index == len(children) and not self.at_end)):
+            return
+        self.tree.insert("", index, iid=iid, values=row)
+        self._keys[iid] = key
+        self._restore_top(anchor)
+
+    def remove_row(self, iid):
+        if self.tree.exists(iid):
+            anchor = self._top_item()
+            self._drop([iid])
+            if anchor != iid:
+                self._restore_top(anchor)
+
+    def _apply_reload(self, rows):
+        self._replace(rows)
+        self._static = False
+        self._query = None
+        self.at_start = True
+        self.at_end = len(rows) < self.page_size
+
+    def _replace(self, rows):
+        self.tree.delete(*self.tree.get_children())
+        self._keys.clear()
+        self._append(rows)
+        self.tree.yview_moveto(0)
+
+    def _append(self, rows):
+        for row in rows:
+            iid = self.iid_for_row(row)
+            self.tree.insert("", tk.END, iid=iid, values=row)
+            self._keys[iid] = self.key_for_row(row)
+
+    def _prepend(self, rows):
+        for row in reversed(rows):
+            iid = self.iid_for_row(row)
+            self.tree.insert("", 0, iid=iid, values=row)
+            self._keys[iid] = self.key_for_row(row)
+
+    def _drop(self, items):
+        self.tree.delete(*items)
+        for iid in items:
+            self._keys.pop(iid, None)
+
+    def _on_tree_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        children = self.tree.get_children()
+        if not children:
+            return
+        if float(last) >= 1 - EDGE_THRESHOLD and not self.at_end:
+            self._loading = True
+            self._run(self._apply_next, self.fetch_page,
+                      self._keys[children[-1]], True, self.page_size)
+        elif float(first) <= EDGE_THRESHOLD and not self.at_start:
+            self._loading = True
+            self._run(self._apply_previous, self.fetch_page,
+                      self._keys[children[0]], False, self.page_size)
+
+    def _top_item(self):
+        children = self.tree.get_children()
+        if not children:
+            return None
+        index = int(self.tree.yview()[0] * len(children))
+        return children[min(index, len(children) - 1)]
+
+    def _restore_top(self, anchor):
+        # Keep the row the user was looking at in the same place after the
+        # window has shifted
+        children = self.tree.get_children()
+        if anchor and children and self.tree.exists(anchor):
+            self.tree.yview_moveto(self.tree.index(anchor) / len(children))
+
+    def _apply_next(self, rows):
+        anchor = self._top_item()
+        self.at_end = len(rows) < self.page_size
+        self._append(rows)
+
+        children = self.tree.get_children()
+        excess = len(children) - self.page_size * self.max_pages
+        if excess > 0:
+            self._drop(children[:excess])
+            self.at_start = False
+        self._loading = False
+        self._restore_top(anchor)
+
+    def _apply_previous(self, rows):
+        anchor = self._top_item()
+        self.at_start = len(rows) < self.page_size
+        self._prepend(rows)
+
+        children = self.tree.get_children()
+        excess = len(children) - self.page_size * self.max_pages
+        if excess > 0:
+            self._drop(children[-excess:])
+            self.at_end = False
+        self._loading = False
+        self._restore_top(anchor)
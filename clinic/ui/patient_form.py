@@ -0,0 +1,65 @@
+import sqlite3
+import tkinter as tk
+from tkinter import messagebox
+
+from clinic import patients
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label, create_styled_entry
+
+def open_patient_form(app, existing=None):
+    def submit():
+        values = {name: entry.get().strip() for name, entry in entries.items()}
+
+        if not all([values["mrn"], values["first_name"], values["last_name"]]):
+            messagebox.showerror("Validation Error", "MRN, First Name, and Last Name are required.")
+            return
+
+        def saved(_):
+            # Only the edited row changes in the list
+            app.on_patient_saved(tuple(values[name] for name in patients.COLUMNS))
+            win.destroy()
+
+        def failed(error):
+            if isinstance(error, sqlite3.IntegrityError):
+                messagebox.showerror("Error", "MRN must be unique.")
+            else:
+                messagebox.showerror("Database Error", str(error))
+
+        if existing:
+            values["mrn"] = existing["mrn"]
+            app.worker.submit(patients.update_patient, **values, on_done=saved, on_error=failed)
+        else:
+            app.worker.submit(patients.add_patient, **values, on_done=saved, on_error=failed)
+
+    win = tk.Toplevel(app.root)
+    win.title("Edit Patient" if existing else "Add New Patient")
+    win.configure(bg=BG_COLOR)
+
+    # Form frame
+    form_frame = tk.Frame(win, bg=BG_COLOR)
+    form_frame.pack(padx=20, pady=20)
+
+    fields = [
+        ("MRN", "mrn"),
+        ("First Name", "first_name"),
+        ("Last Name", "last_name"),
+        ("Age", "age"),
+        ("Translator", "translator")
+    ]
+
+    entries = {}
+    for i, (label, name) in enumerate(fields):
+        create_styled_label(form_frame, label).grid(row=i, column=0, padx=10, pady=5, sticky="e")
+        entries[name] = create_styled_entry(form_frame)
+        entries[name].grid(row=i, column=1, padx=10, pady=5)
+
+    if existing:
+        for name, entry in entries.items():
+            entry.insert(0, existing[name])
+        entries["mrn"].config(state="disabled")
+
+    # Button frame
+    btn_frame = tk.Frame(win, bg=BG_COLOR)
+    btn_frame.pack(pady=10)
+
+    create_styled_button(btn_frame, "Save", submit).grid(row=0, column=0, padx=5)
+    create_styled_button(btn_frame, "Cancel", win.destroy).grid(row=0, column=1, padx=5)
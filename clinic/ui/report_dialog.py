@@ -0,0 +1,104 @@
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from clinic import reports
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label, create_styled_entry
+
+def open_report_dialog(app):
+    try:
+        from tkcalendar import DateEntry
+    except ImportError:
+        messagebox.showerror("Error", "Reports need the tkcalendar package.")
+        return
+
+    cancel_event = threading.Event()
+
+    def update_progress(written, total):
+        if report_win.winfo_exists():
+            progress["value"] = written / total if total else 1.0
+            status.config(text=f"{written:,} of {total:,} rows written")
+
+    def done(written):
+        set_running(False)
+        messagebox.showinfo("Success", f"Report generated successfully! ({written:,} rows)")
+
+    def failed(error):
+        set_running(False)
+        if isinstance(error, reports.ReportCancelled):
+            status.config(text="Report cancelled")
+        else:
+            messagebox.showerror("Error", f"Failed to generate report: {str(error)}")
+
+    def set_running(running):
+        if report_win.winfo_exists():
+            generate_btn.config(state="disabled" if running else "normal")
+            cancel_btn.config(state="normal" if running else "disabled")
+
+    def generate():
+        start_date = start_cal.get_date()
+        end_date = end_cal.get_date()
+        columns = [col for col, var in column_vars.items() if var.get()]
+        if not columns:
+            messagebox.showerror("Error", "Select at least one column")
+            return
+        filters = {key: entry.get().strip() for key, entry in filter_entries.items()}
+
+        filename = filedialog.asksaveasfilename(parent=report_win, defaultextension=".xlsx",
+                                              filetypes=[("Excel files", "*.xlsx"),
+                                                         ("CSV files", "*.csv")])
+        if not filename:
+            return
+
+        cancel_event.clear()
+        set_running(True)
+        # Rows are streamed to the file on the jobs worker
+        app.jobs.submit(reports.write_report, filename, start_date.isoformat(), end_date.isoformat(),
+                        columns, filters,
+                        progress=lambda *args: app.jobs.post(update_progress, *args),
+                        should_cancel=cancel_event.is_set,
+                        on_done=done, on_error=failed)
+
+    report_win = tk.Toplevel(app.root)
+    report_win.title("Generate Report")
+    report_win.configure(bg=BG_COLOR)
+    
+    create_styled_label(report_win, "Start Date:").grid(row=0, column=0, padx=10, pady=5)
+    start_cal = DateEntry(report_win, width=12, background='darkblue',
+                         foreground='white', borderwidth=2)
+    start_cal.grid(row=0, column=1, padx=10, pady=5)
+    
+    create_styled_label(report_win, "End Date:").grid(row=1, column=0, padx=10, pady=5)
+    end_cal = DateEntry(report_win, width=12, background='darkblue',
+                       foreground='white', borderwidth=2)
+    end_cal.grid(row=1, column=1, padx=10, pady=5)
+
+    # Filters
+    filter_entries = {}
+    for i, (key, (label, _)) in enumerate(reports.REPORT_FILTERS.items(), start=2):
+        create_styled_label(report_win, f"{label}:").grid(row=i, column=0, padx=10, pady=5)
+        filter_entries[key] = create_styled_entry(report_win)
+        filter_entries[key].grid(row=i, column=1, padx=10, pady=5)
+
+    # Column picker
+    columns_frame = tk.LabelFrame(report_win, text="Columns", bg=BG_COLOR, font=("Arial", 11))
+    columns_frame.grid(row=0, column=2, rowspan=6, padx=10, pady=5, sticky="n")
+    column_vars = {}
+    for i, (col, (label, _)) in enumerate(reports.REPORT_COLUMNS.items()):
+        column_vars[col] = tk.BooleanVar(value=col in reports.DEFAULT_REPORT_COLUMNS)
+        tk.Checkbutton(columns_frame, text=label, variable=column_vars[col],
+                       bg=BG_COLOR, font=("Arial", 10)).grid(row=i % 7, column=i // 7, sticky="w")
+
+    row = 2 + len(reports.REPORT_FILTERS)
+    progress = ttk.Progressbar(report_win, length=300, maximum=1.0)
+    progress.grid(row=row, column=0, columnspan=2, padx=10, pady=5)
+    status = create_styled_label(report_win, "")
+    status.grid(row=row + 1, column=0, columnspan=2, padx=10)
+
+    btn_frame = tk.Frame(report_win, bg=BG_COLOR)
+    btn_frame.grid(row=row + 2, column=0, columnspan=3, pady=10)
+    generate_btn = create_styled_button(btn_frame, "Generate", generate)
+    generate_btn.grid(row=0, column=0, padx=5)
+    cancel_btn = create_styled_button(btn_frame, "Cancel", cancel_event.set)
+    cancel_btn.grid(row=0, column=1, padx=5)
+    cancel_btn.config(state="disabled")
@@ -0,0 +1,49 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Modern theme colors
+BG_COLOR = "white"         # Pure white background
+ACCENT_COLOR = "#1a237e"   # Deep blue
+TEXT_COLOR = "black"       # Pure black text
+BUTTON_COLOR = "#2196f3"   # Brighter blue for better visibility
+BUTTON_HOVER = "#1976d2"   # Darker blue for hover
+BUTTON_TEXT = "white"      # White text for buttons
+TREE_HEADER_BG = "#1976d2" # Bright blue headers
+TREE_HEADER_FG = "white"   # White header text
+TREE_BG = "white"         # White tree background
+TREE_FG = "black"         # Black tree text
+TREE_SELECTED = "#bbdefb"  # Light blue selection
+
+def create_styled_button(parent, text, command):
+    btn = tk.Button(parent, text=text, command=command, 
+                   bg=BUTTON_COLOR, fg=BUTTON_TEXT, 
+                   font=("Arial", 11, "bold"),
+                   padx=12, pady=6,
+                   relief="raised",
+                   bd=2,                      # Thicker border
+                   highlightthickness=0)      # Remove highlight for macOS
+    btn.bind("<Enter>", lambda e: btn.config(bg=BUTTON_HOVER))
+    btn.bind("<Leave>", lambda e: btn.config(bg=BUTTON_COLOR))
+    return btn
+
+def create_styled_label(parent, text):
+    return tk.Label(parent, text=text, bg=BG_COLOR, fg=TEXT_COLOR, font=("Arial", 11))
+
+def create_styled_entry(parent):
+    return tk.Entry(parent, font=("Arial", 11), relief="solid", bg="white", bd=1)
+
+def configure_styles():
+    style = ttk.Style()
+    style.theme_use('default')  # Reset to default theme first
+    style.configure("Custom.Treeview", 
+                    background=TREE_BG,
+                    foreground=TREE_FG,
+                    fieldbackground=TREE_BG,
+                    font=("Arial", 10))
+    style.configure("Custom.Treeview.Heading",
+                    background=TREE_HEADER_BG,
+                    foreground=TREE_HEADER_FG,
+                    font=("Arial", 10, "bold"))
+    style.map('Custom.Treeview',
+              background=[('selected', TREE_SELECTED)],
+              foreground=[('selected', 'black')])
@@ -0,0 +1,157 @@
+import string
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from clinic import dates, visits
+from clinic.ui.batch_visits import open_batch_visits
+from clinic.ui.column_controls import ColumnControls
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label, create_styled_entry
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def open_visit_history(app, mrn, patient_name):
+    win = tk.Toplevel(app.root)
+    win.title(f"Visit History - {patient_name}")
+    win.configure(bg=BG_COLOR)
+    win.geometry("1200x600")
+
+    # Create main frame
+    main_frame = tk.Frame(win, bg=BG_COLOR)
+    main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+    # Create tree frame
+    tree_frame = tk.Frame(main_frame, bg=BG_COLOR)
+    tree_frame.pack(fill=tk.BOTH, expand=True)
+
+    # Create Treeview
+    cols = visits.HEADINGS
+    tree = ttk.Treeview(tree_frame, columns=cols, show="headings", style="Custom.Treeview")
+    
+    for col in cols:
+        tree.heading(col, text=col)
+        tree.column(col, width=120)
+
+    # Add scrollbar
+    scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    # Items are keyed by visit_id; their values are kept alongside so a new
+    # visit can be slotted into place without reloading the history
+    shown = {}
+
+    def fill_visits(rows):
+        if not tree.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        shown.clear()
+        for visit_id, *values in rows:
+            tree.insert("", tk.END, iid=visit_id, values=values)
+            shown[str(visit_id)] = values
+
+    def sort_key(visit_id, values):
+        # The ORDER BY of get_visits_for_patient: the sort column (NULL
+        # first, NOCASE folding ASCII only), then visit_id
+        value = values[visits.COLUMNS.index(columns.sort)]
+        if value is not None and "NOCASE" in visits.SORTS[columns.sort]:
+            value = value.translate(_ASCII_LOWER)
+        return (value is not None, value or ""), int(visit_id)
+
+    def insert_visit(visit_id, values):
+        # Placed by the current sort; a filter may hide it, so that reloads
+        if columns.filters:
+            refresh_visits()
+            return
+        key = sort_key(visit_id, values)
+        index = len(shown)
+        for i, item in enumerate(tree.get_children()):
+            other = sort_key(item, shown[item])
+            if (other < key) if columns.descending else (other > key):
+                index = i
+                break
+        tree.insert("", index, iid=visit_id, values=values)
+        shown[str(visit_id)] = values
+
+    def refresh_visits():
+        app.worker.submit(visits.get_visits_for_patient, mrn, sort=columns.sort,
+                          descending=columns.descending, filters=columns.filters,
+                          key=("visits", str(tree)), on_done=fill_visits)
+
+    # Sorting and filtering are done by the database, see visits.SORTS
+    columns = ColumnControls(main_frame, tree, visits.COLUMNS, cols, on_change=refresh_visits,
+                             sort="visit_date", descending=True)
+    columns.frame.pack(fill=tk.X, before=tree_frame)
+
+    def on_external_change(tables):
+        if tables & {"Visits", "Followups"} and tree.winfo_exists():
+            refresh_visits()
+
+    remove_listener = app.add_change_listener(on_external_change)
+    win.bind("<Destroy>", lambda event: remove_listener() if event.widget is win else None)
+
+    def add_visit():
+        def submit():
+            values = {name: entry.get().strip() for name, entry in entries.items()}
+
+            if not all([values["visit_date"], values["physician"]]):
+                messagebox.showerror("Error", "Visit Date and Physician are required")
+                return
+            try:
+                values["visit_date"] = dates.to_iso(values["visit_date"])
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            def saved(visit_id):
+                add_win.destroy()
+                if tree.winfo_exists():
+                    insert_visit(visit_id, [values[name] for _, name in fields])
+
+            app.worker.submit(visits.add_visit, mrn, **values, on_done=saved)
+
+        add_win = tk.Toplevel(win)
+        add_win.title("Add Visit")
+        add_win.configure(bg=BG_COLOR)
+
+        # Create form frame
+        form_frame = tk.Frame(add_win, bg=BG_COLOR)
+        form_frame.pack(padx=20, pady=20)
+
+        # Visit fields
+        fields = [
+            ("Visit Date (YYYY-MM-DD)", "visit_date"),
+            ("Physician", "physician"),
+            ("Last CX", "last_cx"),
+            ("Due Notes", "due_notes"),
+            ("OGTT", "ogtt"),
+            ("Opth", "opth"),
+            ("Modulator", "modulator"),
+            ("PFT", "pft"),
+            ("Registry", "registry")
+        ]
+
+        entries = {}
+        for i, (label, name) in enumerate(fields):
+            create_styled_label(form_frame, label).grid(row=i, column=0, padx=10, pady=5, sticky="e")
+            entries[name] = create_styled_entry(form_frame)
+            entries[name].grid(row=i, column=1, padx=10, pady=5)
+
+        # Button frame
+        btn_frame = tk.Frame(add_win, bg=BG_COLOR)
+        btn_frame.pack(pady=10)
+
+        create_styled_button(btn_frame, "Save", submit).grid(row=0, column=0, padx=5)
+        create_styled_button(btn_frame, "Cancel", add_win.destroy).grid(row=0, column=1, padx=5)
+
+    # Button frame
+    button_frame = tk.Frame(main_frame, bg=BG_COLOR)
+    button_frame.pack(fill=tk.X, pady=(10, 0))
+
+    create_styled_button(button_frame, "Add Visit", add_visit).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Batch Entry",
+                         lambda: open_batch_visits(app, mrn)).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
+
+    refresh_visits()
@@ -0,0 +1,130 @@
+import queue
+import sqlite3
+import threading
+import traceback
+from functools import partial
+import tkinter as tk
+from tkinter import messagebox
+
+from clinic import db
+
+# How often the Tk thread checks for finished work
+POLL_MS = 30
+
+
+class Task:
+    def __init__(self, fn, args, kwargs, on_done, on_error, key):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.key = key
+        self.cancelled = False
+
+
+class QueryWorker:
+    # Runs database calls on a background thread that owns its own
+    # connection, so a slow or locked database never stalls the Tk main loop.
+    # Results are handed back through a queue that the Tk thread drains with
+    # root.after; callbacks therefore always run on the Tk thread.
+    #
+    # Tasks submitted with the same key supersede each other: the older one
+    # is skipped if it has not started yet, or interrupted via
+    # Connection.interrupt() if it is running, and its result is discarded.
+
+    def __init__(self, root):
+        self.root = root
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._current = None
+        self._conn = None
+        self._latest = {}
+        self._thread = threading.Thread(target=self._run, name="clinic-db-worker", daemon=True)
+        self._thread.start()
+        self._poll_id = root.after(POLL_MS, self._poll)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        task = Task(fn, args, kwargs, on_done, on_error, key)
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = task
+        self._tasks.put(task)
+        return task
+
+    def cancel(self, key):
+        task = self._latest.pop(key, None)
+        if task is None:
+            return
+        task.cancelled = True
+        with self._lock:
+            if self._current is task and self._conn is not None:
+                self._conn.interrupt()
+
+    def post(self, callback, *args):
+        # Schedule callback(*args) on the Tk thread; safe to call from a task,
+        # e.g. to report progress
+        self._results.put(partial(callback, *args))
+
+    def stop(self):
+        for key in list(self._latest):
+            self.cancel(key)
+        self._tasks.put(None)
+        self._thread.join(timeout=5)
+        try:
+            self.root.after_cancel(self._poll_id)
+        except tk.TclError:
+            pass                # root already destroyed
+
+
+    def _run(self):
+        self._conn = db.get_connection()
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            with self._lock:
+                if task.cancelled:
+                    continue
+                self._current = task
+            try:
+                result, error = task.fn(*task.args, **task.kwargs), None
+            except Exception as e:
+                result, error = None, e
+            finally:
+                with self._lock:
+                    self._current = None
+            self._results.put(partial(self._deliver, task, result, error))
+        db.close_connection()
+
+    def _poll(self):
+        while True:
+            try:
+                callback = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+        self._poll_id = self.root.after(POLL_MS, self._poll)
+
+    def _deliver(self, task, result, error):
+        if task.cancelled:
+            return
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        if error is not None:
+            self._report_error(task, error)
+        elif task.on_done is not None:
+            task.on_done(result)
+
+    def _report_error(self, task, error):
+        if task.on_error is not None:
+            task.on_error(error)
+        elif isinstance(error, sqlite3.Error):
+            messagebox.showerror("Database Error", str(error))
+        else:
+            traceback.print_exception(type(error), error, error.__traceback__)
+            messagebox.showerror("Error", str(error))
@@ -0,0 +1,94 @@
+import tkinter as tk
+from tkinter import ttk
+
+from clinic import worklist
+from clinic.ui.theme import BG_COLOR, create_styled_button, create_styled_label
+from clinic.ui.visit_history import open_visit_history
+
+ALL_PHYSICIANS = "(all physicians)"
+
+def open_worklist(app):
+    win = tk.Toplevel(app.root)
+    win.title("Follow-up Worklist")
+    win.configure(bg=BG_COLOR)
+    win.geometry("1100x600")
+
+    options = tk.Frame(win, bg=BG_COLOR)
+    options.pack(fill=tk.X, padx=20, pady=(20, 5))
+    create_styled_label(options, "Due in the next").pack(side=tk.LEFT, padx=5)
+    days_var = tk.IntVar(value=worklist.DAYS)
+    tk.Spinbox(options, from_=1, to=365, width=5, textvariable=days_var,
+               font=("Arial", 11), command=lambda: refresh()).pack(side=tk.LEFT)
+    create_styled_label(options, "days for").pack(side=tk.LEFT, padx=5)
+    physician_var = tk.StringVar(value=ALL_PHYSICIANS)
+    physicians = ttk.Combobox(options, textvariable=physician_var, state="readonly", width=20)
+    physicians.pack(side=tk.LEFT, padx=5)
+    physicians.bind("<<ComboboxSelected>>", lambda event: refresh())
+    overdue_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(options, text="Include overdue", variable=overdue_var, bg=BG_COLOR,
+                   font=("Arial", 11), command=lambda: refresh()).pack(side=tk.LEFT, padx=10)
+
+    summary = create_styled_label(win, "")
+    summary.pack(fill=tk.X, padx=25, anchor="w")
+
+    tree_frame = tk.Frame(win, bg=BG_COLOR)
+    tree_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+    tree = ttk.Treeview(tree_frame, columns=worklist.HEADINGS, show="headings", style="Custom.Treeview")
+    for col in worklist.HEADINGS:
+        tree.heading(col, text=col)
+        tree.column(col, width=120)
+    tree.column("Due Notes", width=220)
+    scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def show(result):
+        rows, counts, names = result
+        if not win.winfo_exists():
+            return
+        physicians.configure(values=[ALL_PHYSICIANS] + names)
+        tree.delete(*tree.get_children())
+        for i, row in enumerate(rows):
+            tree.insert("", tk.END, iid=i, values=row)
+        summary.config(text="   ".join(f"{physician}: {count}" for physician, count in counts)
+                       or "Nobody is due in this window.")
+
+    def load(days, physician, overdue):
+        return (worklist.get_worklist(days, physician, overdue=overdue),
+                worklist.get_due_counts(days, overdue=overdue),
+                worklist.get_physicians())
+
+    def refresh():
+        try:
+            days = days_var.get()
+        except tk.TclError:
+            return              # half-typed number
+        physician = physician_var.get()
+        app.worker.submit(load, days, None if physician == ALL_PHYSICIANS else physician,
+                          overdue_var.get(), key=("worklist", str(win)), on_done=show)
+
+    def open_selected(event=None):
+        selected = tree.selection()
+        if selected:
+            values = tree.item(selected[0])["values"]
+            # MRNs are read back as text so leading zeros survive
+            mrn = tree.set(selected[0], "MRN")
+            open_visit_history(app, mrn, f"{values[2]} {values[3]}")
+
+    tree.bind("<Double-1>", open_selected)
+
+    def on_external_change(tables):
+        if tables & {"Visits", "Patients"} and win.winfo_exists():
+            refresh()
+
+    remove_listener = app.add_change_listener(on_external_change)
+    win.bind("<Destroy>", lambda event: remove_listener() if event.widget is win else None)
+
+    button_frame = tk.Frame(win, bg=BG_COLOR)
+    button_frame.pack(fill=tk.X, padx=20, pady=(5, 15))
+    create_styled_button(button_frame, "View Visits", open_selected).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Refresh", refresh).pack(side=tk.LEFT, padx=5)
+    create_styled_button(button_frame, "Close", win.destroy).pack(side=tk.LEFT, padx=5)
+
+    refresh()
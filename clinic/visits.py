@@ -0,0 +1,161 @@
+from clinic import cache, dates, db, followups, ordering
+
+HEADINGS = ("Visit Date", "Physician", "Last CX", "Due Notes", "OGTT",
+            "Opth", "Modulator", "PFT", "Registry")
+COLUMNS = ("visit_date", "physician", "last_cx", "due_notes", "ogtt",
+           "opth", "modulator", "pft", "registry")
+
+# Sortable/filterable columns of the visit history: column -> SQL expression
+SORTS = {
+    "visit_date": "v.visit_date",
+    "physician": "v.physician COLLATE NOCASE",
+    "last_cx": "v.last_cx COLLATE NOCASE",
+    "due_notes": "v.due_notes COLLATE NOCASE",
+    "ogtt": "v.ogtt COLLATE NOCASE",
+    "opth": "f.opth COLLATE NOCASE",
+    "modulator": "f.modulator COLLATE NOCASE",
+    "pft": "f.pft COLLATE NOCASE",
+    "registry": "f.registry COLLATE NOCASE",
+}
+
+
+def get_visits_for_patient(mrn, cached=True, sort="visit_date", descending=True, filters=None):
+    # Rows are (visit_id, *HEADINGS columns), newest first by default;
+    # filters maps column -> prefix text. The default view is served from
+    # cache.visit_histories when possible; treat the returned list as
+    # read-only since it may be shared.
+    if (sort, descending) != ("visit_date", True) or any(text.strip() for text in (filters or {}).values()):
+        return _query_visits(mrn, sort, descending, filters)
+    if not cached:
+        return _query_visits(mrn)
+    cache.check_external_changes()
+    return cache.visit_histories.load(mrn, _query_visits, mrn)
+
+
+def _query_visits(mrn, sort="visit_date", descending=True, filters=None):
+    # The mrn lookup uses idx_visits_mrn_date; a patient's visits are few
+    # enough that any other order is a small sort inside SQLite
+    where, params = ["v.mrn = ?"], [mrn]
+    for column, text in (filters or {}).items():
+        if text.strip():
+            clause, values = ordering.prefix_filter(SORTS[column], text.strip())
+            where.append(clause)
+            params.extend(values)
+    order = ordering.order_clause(SORTS[sort], "v.visit_id", not descending)
+    return db.query(f"""
+        SELECT v.visit_id, v.visit_date, v.physician, v.last_cx, v.due_notes, v.ogtt,
+               f.opth, f.modulator, f.pft, f.registry
+        FROM Visits v
+        LEFT JOIN Followups f ON v.visit_id = f.visit_id
+        WHERE {" AND ".join(where)}
+        ORDER BY {order}
+    """, params)
+
+
+@db.retry_on_busy
+def add_visit(mrn, visit_date, physician, last_cx="", due_notes="", ogtt="",
+              opth="", modulator="", pft="", registry=""):
+    # The visit and its follow-up row are written together or not at all.
+    # visit_date may be any format dates.to_iso reads (ValueError otherwise).
+    visit_date = dates.to_iso(visit_date)
+    with db.transaction() as conn:
+        cur = conn.execute("""
+            INSERT INTO Visits (uid, mrn, visit_date, physician, last_cx, due_notes, ogtt)
+            VALUES (lower(hex(randomblob(16))), ?, ?, ?, ?, ?, ?)
+        """, (mrn, visit_date, physician, last_cx, due_notes, ogtt))
+        visit_id = cur.lastrowid
+        followups.save_followup(visit_id, opth, modulator, pft, registry)
+    cache.visit_histories.invalidate(mrn)
+    return visit_id
+
+
+def get_date_issues():
+    # (visit_id, mrn, first_name, last_name, visit_date, physician) for the
+    # visits whose date migration 8 couldn't read
+    return db.query("""
+        SELECT v.visit_id, v.mrn, p.first_name, p.last_name, v.visit_date, v.physician
+        FROM VisitDateIssues i
+        JOIN Visits v ON v.visit_id = i.visit_id
+        JOIN Patients p ON p.mrn = v.mrn
+        ORDER BY v.mrn, v.visit_id
+    """)
+
+
+@db.retry_on_busy
+def fix_visit_date(visit_id, visit_date):
+    # Rewrites one visit's date through the same validation as add_visit;
+    # its VisitDateIssues entry is removed by trigger (migration 11)
+    visit_date = dates.to_iso(visit_date)
+    with db.transaction() as conn:
+        row = conn.execute("SELECT mrn FROM Visits WHERE visit_id = ?", (visit_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"no visit with visit_id {visit_id}")
+        conn.execute("UPDATE Visits SET visit_date = ? WHERE visit_id = ?", (visit_date, visit_id))
+    cache.visit_histories.invalidate(row[0])
+    return visit_date
+
+
+VISIT_FIELDS = ("mrn", "visit_date", "physician", "last_cx", "due_notes", "ogtt")
+FOLLOWUP_FIELDS = ("opth", "modulator", "pft", "registry")
+
+
+def _check_batch(rows):
+    # Normalized copies of the non-blank rows, or ValueError naming every bad
+    # row by its 1-based position in rows
+    numbered, problems = [], []
+    for number, row in enumerate(rows, start=1):
+        record = {name: (row.get(name) or "").strip() for name in VISIT_FIELDS + FOLLOWUP_FIELDS}
+        if not any(record.values()):
+            continue
+        missing = [name for name in ("mrn", "visit_date", "physician") if not record[name]]
+        if missing:
+            problems.append((number, f"{', '.join(missing)} required"))
+            continue
+        try:
+            record["visit_date"] = dates.to_iso(record["visit_date"])
+        except ValueError as e:
+            problems.append((number, str(e)))
+            continue
+        numbered.append((number, record))
+
+    mrns = list({record["mrn"] for _, record in numbered})
+    known = set()
+    for i in range(0, len(mrns), 500):
+        chunk = mrns[i:i + 500]
+        known.update(row[0] for row in db.query(
+            f"SELECT mrn FROM Patients WHERE mrn IN ({','.join('?' * len(chunk))})", chunk))
+    problems.extend((number, f"no patient with MRN {record['mrn']}")
+                    for number, record in numbered if record["mrn"] not in known)
+    if problems:
+        raise ValueError("\n".join(f"row {number}: {problem}" for number, problem in sorted(problems)))
+    return [record for _, record in numbered]
+
+
+@db.retry_on_busy
+def add_visits(rows):
+    # Saves many visits (dicts of VISIT_FIELDS + FOLLOWUP_FIELDS) and their
+    # follow-ups in one transaction: all of them or, if any row is invalid,
+    # none. Blank rows are skipped. Returns the new visit_ids in row order.
+    records = _check_batch(rows)
+    with db.transaction() as conn:
+        # executemany can't report rowids, so number the visits ourselves;
+        # BEGIN IMMEDIATE holds the write lock, so nobody else takes these ids
+        # (writing them explicitly also advances AUTOINCREMENT's counter)
+        start = conn.execute("""
+            SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'Visits'), 0),
+                       IFNULL((SELECT MAX(visit_id) FROM Visits), 0))
+        """).fetchone()[0] + 1
+        visit_ids = list(range(start, start + len(records)))
+        conn.executemany("""
+            INSERT INTO Visits (visit_id, uid, mrn, visit_date, physician, last_cx, due_notes, ogtt)
+            VALUES (?, lower(hex(randomblob(16))), ?, ?, ?, ?, ?, ?)
+        """, [(visit_id, *(record[name] for name in VISIT_FIELDS))
+              for visit_id, record in zip(visit_ids, records)])
+        conn.executemany("""
+            INSERT INTO Followups (visit_id, opth, modulator, pft, registry)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(visit_id, *(record[name] for name in FOLLOWUP_FIELDS))
+              for visit_id, record in zip(visit_ids, records)])
+    for mrn in {record["mrn"] for record in records}:
+        cache.visit_histories.invalidate(mrn)
+    return visit_ids
@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+
+from clinic import db
+
+# Follow-up worklist: patients whose follow-up date (Visits.next_due, parsed
+# from the due notes by migration 9) falls in a date window. Only a
+# patient's latest visit counts; an older visit's follow-up was dealt with
+# by the visit after it. The window is a range scan on idx_visits_next_due,
+# and each candidate is checked for a later visit through idx_visits_mrn_date.
+
+DAYS = 14
+
+COLUMNS = ("next_due", "mrn", "first_name", "last_name", "physician", "visit_date", "due_notes")
+HEADINGS = ("Due", "MRN", "First Name", "Last Name", "Physician", "Last Visit", "Due Notes")
+
+_LATEST_VISIT = """
+    NOT EXISTS (SELECT 1 FROM Visits later
+                WHERE later.mrn = v.mrn AND later.visit_date >= v.visit_date
+                  AND (later.visit_date > v.visit_date OR later.visit_id > v.visit_id))
+"""
+
+
+def _window(days, today, overdue):
+    # [start, end) as ISO dates; overdue=True also takes everything before today
+    today = today or date.today()
+    start = "0000-00-00" if overdue else today.isoformat()
+    return start, (today + timedelta(days=days)).isoformat()
+
+
+def get_worklist(days=DAYS, physician=None, today=None, overdue=False):
+    # COLUMNS rows for follow-ups due from today through today + days - 1,
+    # soonest first; physician="" or None means every physician
+    start, end = _window(days, today, overdue)
+    where, params = ["v.next_due >= ?", "v.next_due < ?"], [start, end]
+    if physician:
+        where.append("v.physician = ?")
+        params.append(physician)
+    return db.query(f"""
+        SELECT v.next_due, v.mrn, p.first_name, p.last_name, v.physician, v.visit_date, v.due_notes
+        FROM Visits v
+        JOIN Patients p ON p.mrn = v.mrn
+        WHERE {" AND ".join(where)} AND {_LATEST_VISIT}
+        ORDER BY v.next_due, v.physician, v.mrn
+    """, params)
+
+
+def get_due_counts(days=DAYS, today=None, overdue=False):
+    # (physician, patients due) over the same window, busiest first
+    start, end = _window(days, today, overdue)
+    return db.query(f"""
+        SELECT v.physician, COUNT(*) FROM Visits v
+        WHERE v.next_due >= ? AND v.next_due < ? AND {_LATEST_VISIT}
+        GROUP BY v.physician ORDER BY COUNT(*) DESC, v.physician
+    """, (start, end))
+
+
+def get_physicians():
+    # Everyone with visits, from the dashboard summary instead of a scan of Visits
+    return [row[0] for row in db.query("SELECT DISTINCT physician FROM DashboardMonthly ORDER BY physician")]
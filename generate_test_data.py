@@ -1,93 +1,131 @@
-import sqlite3
+import argparse
 import random
+import time
 from datetime import datetime, timedelta
 
-DB_PATH = "clinic_data.db"
+from clinic import cache, db, open_database
 
-def generate_test_data():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    # Clear existing data
-    cur.execute("DELETE FROM Followups")
-    cur.execute("DELETE FROM Visits")
-    cur.execute("DELETE FROM Patients")
-    
-    # Generate test patients
-    test_patients = [
-        ("12345", "John", "Doe", "25", "Spanish"),
-        ("67890", "Jane", "Smith", "30", "None"),
-        ("24680", "Bob", "Johnson", "45", "French"),
-        ("13579", "Sarah", "Williams", "28", "Arabic"),
-        ("86420", "Michael", "Brown", "35", "None"),
-        ("97531", "Emily", "Davis", "22", "Spanish"),
-        ("12346", "David", "Wilson", "40", "None"),
-        ("67891", "Lisa", "Taylor", "33", "French"),
-        ("24681", "James", "Anderson", "50", "None"),
-        ("13580", "Jennifer", "Thomas", "27", "Spanish")
-    ]
-    
-    cur.executemany("""
-        INSERT INTO Patients (mrn, first_name, last_name, age, translator)
-        VALUES (?, ?, ?, ?, ?)
-    """, test_patients)
-    
-    # Generate test visits (3-5 visits per patient over the last 2 years)
-    test_visits = []
-    physicians = ["Dr. Smith", "Dr. Jones", "Dr. Brown", "Dr. White", "Dr. Green"]
-    cx_results = ["Positive", "Negative"]
-    ogtt_results = ["Normal", "Abnormal", "Borderline"]
-    
-    for mrn, _, _, _, _ in test_patients:
-        num_visits = random.randint(3, 5)
-        base_date = datetime.now() - timedelta(days=730)  # 2 years ago
-        
-        for _ in range(num_visits):
-            visit_date = base_date + timedelta(days=random.randint(0, 730))
-            physician = random.choice(physicians)
-            last_cx = random.choice(cx_results)
-            due_notes = f"Follow up in {random.randint(1, 12)} months"
-            ogtt = random.choice(ogtt_results)
-            
-            test_visits.append((
-                mrn,
-                visit_date.strftime("%Y-%m-%d"),
-                physician,
-                last_cx,
-                due_notes,
-                ogtt
-            ))
-    
-    cur.executemany("""
-        INSERT INTO Visits (mrn, visit_date, physician, last_cx, due_notes, ogtt)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, test_visits)
-    
-    # Get visit IDs and add followups
-    cur.execute("SELECT visit_id FROM Visits")
-    visit_ids = [row[0] for row in cur.fetchall()]
-    
-    test_followups = []
-    modulators = ["None", "Kalydeco", "Trikafta", "Symdeko", "Orkambi"]
-    pft_results = ["Normal", "Abnormal", "Mild", "Moderate", "Severe"]
-    
-    for visit_id in visit_ids:
-        test_followups.append((
-            visit_id,
-            random.choice(["Yes", "No"]),
-            random.choice(modulators),
-            random.choice(pft_results),
-            random.choice(["Y", "N", "Pending"])
-        ))
-    
-    cur.executemany("""
-        INSERT INTO Followups (visit_id, opth, modulator, pft, registry)
-        VALUES (?, ?, ?, ?, ?)
-    """, test_followups)
-    
-    conn.commit()
-    conn.close()
-    print("Test data generated successfully!")
+BATCH_SIZE = 10000
+
+FIRST_NAMES = ["John", "Jane", "Bob", "Sarah", "Michael", "Emily", "David", "Lisa", "James",
+               "Jennifer", "Maria", "Ahmed", "Wei", "Fatima", "Carlos", "Aisha", "Noah", "Olivia"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Williams", "Brown", "Davis", "Wilson", "Taylor",
+              "Anderson", "Thomas", "Garcia", "Nguyen", "Khan", "Lopez", "Chen", "Patel", "Kim"]
+TRANSLATORS = ["None", "None", "None", "Spanish", "French", "Arabic", "Mandarin"]
+PHYSICIANS = ["Dr. Smith", "Dr. Jones", "Dr. Brown", "Dr. White", "Dr. Green"]
+CX_RESULTS = ["Positive", "Negative"]
+OGTT_RESULTS = ["Normal", "Abnormal", "Borderline"]
+MODULATORS = ["None", "Kalydeco", "Trikafta", "Symdeko", "Orkambi"]
+PFT_RESULTS = ["Normal", "Abnormal", "Mild", "Moderate", "Severe"]
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate_test_data(patients=10, min_visits=3, max_visits=5, days=730, seed=None,
+                       clear=True, progress=True):
+    # Rows are produced lazily and written with executemany in batches, all
+    # inside one transaction, so millions of rows don't need millions of
+    # commits or a list holding every row.
+    rng = random.Random(seed)
+    base_date = datetime.now() - timedelta(days=days)
+    start = time.perf_counter()
+
+    conn = db.get_connection()
+    conn.execute("PRAGMA synchronous=OFF")
+    try:
+        with db.transaction():
+            if clear:
+                # Clear existing data
+                conn.execute("DELETE FROM Followups")
+                conn.execute("DELETE FROM Visits")
+                conn.execute("DELETE FROM Patients")
+
+            # Ids and MRNs are never reused, even after clearing: the audit
+            # trail and change log of the deleted rows would otherwise read
+            # as the new rows' history
+            last_mrn = conn.execute("""
+                SELECT MAX(IFNULL((SELECT MAX(CAST(mrn AS INTEGER)) FROM Patients), 0),
+                           IFNULL((SELECT MAX(CAST(mrn AS INTEGER)) FROM AuditLog), 0))
+            """).fetchone()[0]
+            first_mrn = max(100000, last_mrn + 1)
+            first_visit_id = conn.execute("""
+                SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'Visits'), 0),
+                           IFNULL((SELECT MAX(visit_id) FROM Visits), 0))
+            """).fetchone()[0] + 1
+            mrns = [str(first_mrn + i) for i in range(patients)]
+
+            def patient_rows():
+                for mrn in mrns:
+                    yield (mrn, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                           str(rng.randint(1, 60)), rng.choice(TRANSLATORS))
+
+            for batch in _batches(patient_rows()):
+                conn.executemany("""
+                    INSERT INTO Patients (mrn, first_name, last_name, age, translator)
+                    VALUES (?, ?, ?, ?, ?)
+                """, batch)
+
+            # Visit ids are assigned here so each followup can be written with
+            # its visit in the same batch, without reading the ids back
+            def visit_rows():
+                visit_id = first_visit_id
+                for mrn in mrns:
+                    for _ in range(rng.randint(min_visits, max_visits)):
+                        visit_date = base_date + timedelta(days=rng.randint(0, days))
+                        yield ((visit_id, mrn, visit_date.strftime("%Y-%m-%d"),
+                                rng.choice(PHYSICIANS), rng.choice(CX_RESULTS),
+                                f"Follow up in {rng.randint(1, 12)} months",
+                                rng.choice(OGTT_RESULTS)),
+                               (visit_id, rng.choice(["Yes", "No"]), rng.choice(MODULATORS),
+                                rng.choice(PFT_RESULTS), rng.choice(["Y", "N", "Pending"])))
+                        visit_id += 1
+
+            visit_count = 0
+            for i, batch in enumerate(_batches(visit_rows()), start=1):
+                conn.executemany("""
+                    INSERT INTO Visits (visit_id, uid, mrn, visit_date, physician, last_cx, due_notes, ogtt)
+                    VALUES (?, lower(hex(randomblob(16))), ?, ?, ?, ?, ?, ?)
+                """, [visit for visit, _ in batch])
+                conn.executemany("""
+                    INSERT INTO Followups (visit_id, opth, modulator, pft, registry)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [followup for _, followup in batch])
+                visit_count += len(batch)
+                if progress and i % 10 == 0:
+                    print(f"  {visit_count:,} visits...")
+    finally:
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA optimize")
+    cache.visit_histories.clear()
+    if progress:
+        print(f"Test data generated successfully! {patients:,} patients, {visit_count:,} visits "
+              f"in {time.perf_counter() - start:.1f}s")
+    return patients, visit_count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a clinic database with synthetic data")
+    parser.add_argument("--db", help="database file (default: clinic_data.db)")
+    parser.add_argument("--patients", type=int, default=10)
+    parser.add_argument("--min-visits", type=int, default=3, help="visits per patient, lower bound")
+    parser.add_argument("--max-visits", type=int, default=5, help="visits per patient, upper bound")
+    parser.add_argument("--days", type=int, default=730, help="spread visits over this many past days")
+    parser.add_argument("--seed", type=int, help="random seed for a reproducible dataset")
+    parser.add_argument("--append", action="store_true", help="keep existing rows instead of clearing")
+    args = parser.parse_args(argv)
+
+    open_database(args.db)
+    try:
+        generate_test_data(args.patients, args.min_visits, args.max_visits, args.days,
+                           seed=args.seed, clear=not args.append)
+    finally:
+        db.close_all()
 
 if __name__ == "__main__":
-    generate_test_data() 
\ No newline at end of file
+    main()
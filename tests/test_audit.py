@@ -0,0 +1,52 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from clinic import audit, db, open_database, patients
+
+
+class AuditActorTest(unittest.TestCase):
+    # The audit triggers live in the shared file, so they must work for every
+    # writer, not just connections opened by the app
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "clinic.db")
+        open_database(self.path)
+        patients.add_patient("A1", "Ann", "Lee", "30", "")
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir)
+
+    def last_entry(self):
+        return db.query_one("SELECT actor, action, changes FROM AuditLog ORDER BY audit_id DESC LIMIT 1")
+
+    def test_plain_sqlite_connection_can_write(self):
+        plain = sqlite3.connect(self.path)
+        try:
+            plain.execute("UPDATE Patients SET first_name = 'Anne' WHERE mrn = 'A1'")
+            plain.commit()
+        finally:
+            plain.close()
+        self.assertEqual(self.last_entry(), ("unknown", "U", '{"first_name":["Ann","Anne"]}'))
+
+    def test_app_writes_record_the_actor(self):
+        self.assertEqual(self.last_entry()[0], db.AUDIT_ACTOR)
+        with db.acting_as("tester (import)"):
+            patients.update_patient("A1", "Ann", "Lee", "31", "")
+        self.assertEqual(self.last_entry()[0], "tester (import)")
+        # Cleared after every commit, so other tools aren't credited to us
+        self.assertIsNone(db.query_one("SELECT actor FROM AuditActor")[0])
+
+    def test_patient_history(self):
+        patients.update_patient("A1", "Ann", "Lee", "31", "Spanish")
+        history = audit.get_patient_history("A1")
+        self.assertEqual([row[4] for row in history], ["changed", "added"])
+        self.assertEqual(history[0][5], "age: 30 -> 31; translator: (blank) -> Spanish")
+
+
+if __name__ == "__main__":
+    unittest.main()
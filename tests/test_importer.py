@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from clinic import db, importer, open_database, patients
+
+
+class EncodingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        open_database(os.path.join(self.dir, "clinic.db"))
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir)
+
+    def write(self, data):
+        path = os.path.join(self.dir, "patients.csv")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_cp1252_accent_at_end_of_file(self):
+        # The only non-ASCII byte is in the file's last cell
+        path = self.write("mrn,first_name,last_name,age,translator\r\n"
+                          "A1,Ann,Lee,30,José\r\n".encode("cp1252"))
+        self.assertEqual(importer._detect_encoding(path), "cp1252")
+        self.assertEqual(importer.import_csv(path).imported, 1)
+        self.assertEqual(patients.get_patient("A1")["translator"], "José")
+
+    def test_utf8_cut_off_by_the_sample(self):
+        # The sample ends in the middle of "é"; the file itself is fine
+        row = "A1,José,Ruiz,40,\r\n".encode("utf-8")
+        padding = b"x" * (importer.ENCODING_SAMPLE - len(row) - row.index(b"\xa9"))
+        path = self.write(row + padding + row)
+        self.assertEqual(importer._detect_encoding(path), "utf-8-sig")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from clinic import db, instrumentation, open_database, patients
+
+
+class QueryStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        open_database(os.path.join(self.dir, "clinic.db"))
+        patients.add_patient("A1", "Ann", "Lee", "30", "")
+        instrumentation.reset_stats()
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir)
+
+    def stats(self, sql):
+        return next((s for s in instrumentation.get_stats() if s["sql"] == sql), None)
+
+    def test_query_one_is_recorded(self):
+        sql = "SELECT first_name FROM Patients WHERE mrn = ?"
+        db.query_one(sql, ("A1",))
+        db.query_one(sql, ("A1",))
+        stats = self.stats(sql)
+        self.assertEqual((stats["calls"], stats["rows"]), (2, 2))
+
+    def test_unread_rows_are_recorded(self):
+        # Counted as soon as the statement runs, before any row is fetched
+        cur = db.get_connection().execute("SELECT mrn FROM Patients")
+        self.assertEqual(self.stats("SELECT mrn FROM Patients")["calls"], 1)
+        cur.close()
+
+    def test_pragmas_are_recorded(self):
+        db.close_all()
+        db.get_connection()
+        self.assertIsNotNone(self.stats("PRAGMA busy_timeout=5000"))
+        self.assertIsNotNone(self.stats("PRAGMA journal_mode=WAL"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from clinic import db, open_database, patients, sync, visits
+
+
+class FullSyncTest(unittest.TestCase):
+    # Two copies that split before schema 7 and each added a visit under the
+    # same visit_id, so migration 7 gave both the uid 'v2'
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.a = os.path.join(self.dir, "a.db")
+        self.b = os.path.join(self.dir, "b.db")
+        open_database(self.a)
+        patients.add_patient("A1", "Ann", "Lee", "30", "")
+        visits.add_visit("A1", "2024-01-01", "Dr. X")
+        db.close_all()
+        shutil.copy(self.a, self.b)
+        for path, visit_date, physician in ((self.a, "2024-02-01", "Dr. A"),
+                                            (self.b, "2024-03-01", "Dr. B")):
+            open_database(path)
+            visits.add_visit("A1", visit_date, physician, opth=physician)
+            db.close_all()
+            conn = sqlite3.connect(path)
+            conn.execute("UPDATE Visits SET uid = 'v' || visit_id")
+            conn.execute("DELETE FROM ChangeLog")
+            conn.execute("UPDATE SyncState SET value = ? WHERE key IN ('site_id', 'origin')", (path,))
+            conn.commit()
+            conn.close()
+        open_database(self.a)
+
+    def tearDown(self):
+        db.close_all()
+        shutil.rmtree(self.dir)
+
+    def visits_in(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("""
+                SELECT visit_date, physician, f.opth FROM Visits v
+                LEFT JOIN Followups f USING (visit_id) ORDER BY visit_date
+            """).fetchall()
+        finally:
+            conn.close()
+
+    def check(self, prefer):
+        result = sync.sync(self.b, prefer=prefer, full=True)
+        self.assertEqual((result.split, result.conflicts), (1, []))
+        expected = [("2024-01-01", "Dr. X", ""), ("2024-02-01", "Dr. A", "Dr. A"),
+                    ("2024-03-01", "Dr. B", "Dr. B")]
+        db.close_all()
+        self.assertEqual(self.visits_in(self.a), expected)
+        self.assertEqual(self.visits_in(self.b), expected)
+
+    def test_both_visits_kept(self):
+        self.check(None)
+
+    def test_both_visits_kept_with_prefer(self):
+        self.check("remote")
+
+
+if __name__ == "__main__":
+    unittest.main()